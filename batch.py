@@ -0,0 +1,137 @@
+# batch.py
+
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from braille_translator import translate_to_grade2_braille, translate_from_braille
+
+DEFAULT_GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grammar')
+
+# Sentences sent to a worker per task
+DEFAULT_CHUNK_SIZE = 64
+
+# What a batch can do with each sentence
+TO_BRAILLE = 'to_braille'
+FROM_BRAILLE = 'from_braille'
+PARSE = 'parse'  # Parse with the grammar, then translate to Braille if it parses
+MODES = (TO_BRAILLE, FROM_BRAILLE, PARSE)
+
+# One result per input sentence; error holds the message if that sentence failed
+BatchResult = namedtuple('BatchResult', ['input', 'output', 'grammatical', 'tree_count', 'error'])
+
+# Set once per worker process by init_worker
+_parser = None
+
+
+def init_worker(grammar_dir, mode):
+    """
+    Loads the grammar and parser once when a worker process starts
+    (used as the pool initializer, also by server.py).
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :param mode: The mode the worker will run; only PARSE needs the grammar.
+    """
+    global _parser
+    if mode == PARSE:
+        from grammar_loader import get_parser
+        _parser = get_parser(grammar_dir)
+
+
+def _process_one(sentence, mode, deadline=None):
+    try:
+        if mode == TO_BRAILLE:
+            return BatchResult(sentence, translate_to_grade2_braille(sentence), None, None, None)
+        if mode == FROM_BRAILLE:
+            return BatchResult(sentence, translate_from_braille(sentence), None, None, None)
+
+        from cfg import preprocess_sentence, custom_tokenize
+        from forest import cached_parse_forest
+
+        from lexicon import Deadline, ParseCancelled, make_parser
+
+        parser = _parser
+        if deadline is not None:
+            parser = make_parser(_parser.grammar(), Deadline(deadline))
+
+        preprocessed = preprocess_sentence(sentence)
+        try:
+            forest = cached_parse_forest(parser, custom_tokenize(preprocessed))
+        except ParseCancelled:
+            return BatchResult(sentence, None, None, None, "Parse stopped at the deadline")
+        except ValueError:
+            # Some words are not in the lexicon (same as translate_cli.is_valid_sentence)
+            return BatchResult(sentence, None, False, 0, None)
+        if not forest.is_grammatical():
+            return BatchResult(sentence, None, False, 0, None)
+        braille = translate_to_grade2_braille(preprocessed)
+        return BatchResult(sentence, braille, True, forest.count(), None)
+    except Exception as e:
+        return BatchResult(sentence, None, None, None, f"{type(e).__name__}: {e}")
+
+
+def process_chunk(sentences, mode, deadline=None):
+    """
+    Processes a list of sentences inside a worker (see init_worker).
+
+    :param sentences: A list of strings.
+    :param mode: TO_BRAILLE, FROM_BRAILLE or PARSE.
+    :param deadline: Optional time.time() value; a parse still running then is
+        stopped and reported as an error for its sentence.
+    :return: A list of BatchResult, one per sentence.
+    """
+    return [_process_one(sentence, mode, deadline) for sentence in sentences]
+
+
+def iter_batch(sentences, mode=TO_BRAILLE, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+               grammar_dir=DEFAULT_GRAMMAR_DIR):
+    """
+    Translates (or parses) sentences on a pool of worker processes.
+    Results come back in input order. Only a bounded number of chunks is in
+    flight at a time, so the input can be an arbitrarily long iterator.
+
+    :param sentences: An iterable of strings.
+    :param mode: TO_BRAILLE, FROM_BRAILLE or PARSE.
+    :param max_workers: Number of worker processes (default: one per CPU).
+    :param chunk_size: Number of sentences handed to a worker per task.
+    :param grammar_dir: Path to the directory containing POS .txt files (PARSE only).
+    :return: An iterator of BatchResult, one per sentence.
+    :raises ValueError: On an unknown mode, or max_workers / chunk_size below 1.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown batch mode: {mode!r} (expected one of {MODES})")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    # Checked here, not on the first next(), since the loop below is a generator
+    return _iter_batch(iter(sentences), mode, max_workers, chunk_size, grammar_dir)
+
+
+def _iter_batch(sentences, mode, max_workers, chunk_size, grammar_dir):
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=init_worker, initargs=(grammar_dir, mode)
+    ) as executor:
+        pending = deque()
+        while True:
+            # Keep every worker busy, with one extra chunk queued each
+            while len(pending) < 2 * max_workers:
+                chunk = list(islice(sentences, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(process_chunk, chunk, mode))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def translate_batch(sentences, mode=TO_BRAILLE, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    grammar_dir=DEFAULT_GRAMMAR_DIR):
+    """
+    Same as iter_batch, but returns all results as a list.
+    """
+    return list(iter_batch(sentences, mode, max_workers, chunk_size, grammar_dir))
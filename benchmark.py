@@ -0,0 +1,297 @@
+# benchmark.py
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from nltk import CFG
+from nltk.parse import ChartParser
+
+import braille_translator
+from braille_translator import translate_to_grade2_braille, translate_from_braille
+from cfg import read_pos_files, construct_grammar, preprocess_sentence, custom_tokenize
+from forest import ParseForest
+from lexicon import read_lexicon, build_structural_grammar, make_parser
+from lexicon_binary import BinaryLexicon, compile_binary_lexicon
+
+DEFAULT_GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grammar')
+
+# Corpus sizes (bytes of English text) for the translation stages
+DEFAULT_SIZES = '1K,10K,100K,1M'
+FULL_SIZES = '1K,10K,100K,1M,10M,100M'
+
+# Sentence lengths for the parser stages
+DEFAULT_LENGTHS = '3,6,12,24'
+
+# Words the synthetic corpus is drawn from (contractions, plain words, capitals, numbers)
+CORPUS_WORDS = (
+    'the and for with of to but can do go have in it that this you she he they we '
+    'cat dog sat barked food table book mine hers eating angry quickly brown '
+    'The They Will That 4 12 2024 365'
+).split()
+
+SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    """
+    Parses a size such as '10K' or '100M' into a number of bytes.
+    """
+    text = text.strip().upper()
+    if text[-1] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def synthetic_corpus(size, seed=0):
+    """
+    Builds deterministic English text of roughly ``size`` bytes.
+    """
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(CORPUS_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def measure(stage, func, params=None, ops=1, unit='ops', repeat=3, setup=None):
+    """
+    Times a stage (best of ``repeat`` runs) and measures its peak memory in
+    one extra run under tracemalloc.
+
+    :param stage: Name of the stage.
+    :param func: Callable running the stage once.
+    :param params: Dictionary describing the input (recorded as-is).
+    :param ops: Amount of work per run, used for the throughput.
+    :param unit: What ``ops`` counts (e.g. 'bytes', 'sentences').
+    :param repeat: Number of timed runs.
+    :param setup: Optional callable run before every run (not timed).
+    :return: A result dictionary.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    best = min(times)
+    result = {
+        'stage': stage,
+        'params': params or {},
+        'wall_time_s': best,
+        'mean_time_s': sum(times) / len(times),
+        'ops': ops,
+        'unit': unit,
+        'ops_per_sec': ops / best if best > 0 else None,
+        'peak_memory_bytes': peak,
+    }
+    print(f"{stage:<28} {json.dumps(params or {}):<44} {best * 1000:10.2f} ms"
+          f"  {result['ops_per_sec'] or 0:14.1f} {unit}/s  {peak / 1024:10.1f} KiB", file=sys.stderr)
+    return result
+
+
+def bench_grammar(grammar_dir, repeat, legacy):
+    results = []
+    if legacy:
+        # The original pipeline: every word compiled into one big CFG
+        lexicon = read_pos_files(grammar_dir)
+        grammar_string = construct_grammar(lexicon)
+        results.append(measure('read_pos_files', lambda: read_pos_files(grammar_dir), repeat=repeat))
+        results.append(measure('construct_grammar', lambda: construct_grammar(lexicon), repeat=repeat))
+        results.append(measure('CFG.fromstring', lambda: CFG.fromstring(grammar_string), repeat=1))
+        grammar = CFG.fromstring(grammar_string)
+        results.append(measure('ChartParser', lambda: ChartParser(grammar), repeat=repeat))
+
+    lexicon = read_lexicon(grammar_dir)
+    results.append(measure('read_lexicon', lambda: read_lexicon(grammar_dir), repeat=repeat))
+    results.append(measure('build_structural_grammar',
+                           lambda: build_structural_grammar(lexicon), repeat=repeat))
+    grammar = build_structural_grammar(lexicon)
+    results.append(measure('make_parser', lambda: make_parser(grammar), repeat=repeat))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'lexicon.bin')
+        results.append(measure('compile_binary_lexicon',
+                               lambda: compile_binary_lexicon(grammar_dir, path), repeat=repeat))
+        results.append(measure('open_binary_lexicon',
+                               lambda: BinaryLexicon(path).close(), repeat=repeat))
+    return results
+
+
+def parser_sentences(length):
+    """
+    Yields (kind, sentence) pairs of about ``length`` tokens with growing ambiguity.
+    """
+    simple = ' '.join((['the', 'cat', 'sat', 'on', 'the', 'table'] * length)[:length])
+    conjunctions = ' and '.join(['cat'] * ((length + 1) // 2))
+    digits = ' '.join(str(i % 10) for i in range(length))
+    return [('simple', simple), ('conjunction_chain', conjunctions), ('digit_run', digits)]
+
+
+def bench_parser(grammar_dir, lengths, repeat):
+    results = []
+    parser = make_parser(build_structural_grammar(read_lexicon(grammar_dir)))
+    for length in lengths:
+        for kind, sentence in parser_sentences(length):
+            tokens = custom_tokenize(preprocess_sentence(sentence))
+            params = {'kind': kind, 'tokens': len(tokens)}
+
+            def recognise():
+                ParseForest(parser, tokens).is_grammatical()
+
+            def count():
+                ParseForest(parser, tokens).count()
+
+            results.append(measure('parse_recognise', recognise, dict(params), repeat=repeat))
+            result = measure('parse_count', count, dict(params), repeat=repeat)
+            result['params']['trees'] = ParseForest(parser, tokens).count()
+            results.append(result)
+    return results
+
+
+def bench_translation(sizes, repeat):
+    results = []
+    for size in sizes:
+        english = synthetic_corpus(size)
+        braille = translate_to_grade2_braille(english)
+        params = {'bytes': size}
+        # Start every run with cold word caches
+        clear = braille_translator.clear_word_caches
+        results.append(measure('translate_to_grade2_braille',
+                               lambda: translate_to_grade2_braille(english),
+                               params, ops=len(english.encode('utf-8')), unit='bytes',
+                               repeat=repeat, setup=clear))
+        results.append(measure('translate_from_braille',
+                               lambda: translate_from_braille(braille),
+                               params, ops=len(braille.encode('utf-8')), unit='bytes',
+                               repeat=repeat, setup=clear))
+    return results
+
+
+def bench_cells(sizes, repeat):
+    try:
+        import braille_cells
+    except ImportError:
+        print("Skipping the cells stage (NumPy is not installed)", file=sys.stderr)
+        return []
+
+    results = []
+    for size in sizes:
+        english = synthetic_corpus(size)
+        cells = braille_cells.text_to_cells(english)
+        braille = braille_cells.cells_to_unicode(cells)
+        params = {'bytes': size}
+        ops = len(english.encode('utf-8'))
+        results.append(measure('text_to_cells', lambda: braille_cells.text_to_cells(english),
+                               params, ops=ops, unit='bytes', repeat=repeat))
+        results.append(measure('cells_to_text', lambda: braille_cells.cells_to_text(cells),
+                               params, ops=ops, unit='bytes', repeat=repeat))
+        results.append(measure('unicode_to_cells', lambda: braille_cells.unicode_to_cells(braille),
+                               params, ops=len(cells), unit='cells', repeat=repeat))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(baseline, results):
+    """
+    Prints the wall-time ratio of each stage against a baseline report.
+    """
+    def key(result):
+        return result['stage'], json.dumps(result['params'], sort_keys=True)
+
+    previous = {key(r): r for r in baseline['results']}
+    for result in results:
+        old = previous.get(key(result))
+        if old is None or not old['wall_time_s']:
+            continue
+        ratio = result['wall_time_s'] / old['wall_time_s']
+        print(f"{result['stage']:<28} {json.dumps(result['params']):<44} x{ratio:6.2f}"
+              f"{'  (slower)' if ratio > 1.1 else ''}", file=sys.stderr)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmark grammar loading, parsing and Braille translation (JSON report)."
+    )
+    arg_parser.add_argument('-o', '--output', default='-', help="Where to write the JSON report.")
+    arg_parser.add_argument('--stages', default='grammar,parser,translation,cells',
+                            help="Comma-separated stages to run.")
+    arg_parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                            help=f"Corpus sizes for translation and cells (use '{FULL_SIZES}' for the full run).")
+    arg_parser.add_argument('--lengths', default=DEFAULT_LENGTHS, help="Sentence lengths for parsing.")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Timed runs per measurement (best is kept).")
+    arg_parser.add_argument('--legacy', action='store_true',
+                            help="Also time the original full-lexicon CFG build (slow).")
+    arg_parser.add_argument('--grammar-dir', default=DEFAULT_GRAMMAR_DIR,
+                            help="Directory containing the POS .txt files.")
+    arg_parser.add_argument('--compare', help="Earlier JSON report to compare wall times against.")
+    args = arg_parser.parse_args(argv)
+
+    stages = set(args.stages.split(','))
+    results = []
+    if 'grammar' in stages:
+        results += bench_grammar(args.grammar_dir, args.repeat, args.legacy)
+    if 'parser' in stages:
+        results += bench_parser(args.grammar_dir, [int(n) for n in args.lengths.split(',')], args.repeat)
+    if 'translation' in stages:
+        results += bench_translation([parse_size(s) for s in args.sizes.split(',')], args.repeat)
+    if 'cells' in stages:
+        results += bench_cells([parse_size(s) for s in args.sizes.split(',')], args.repeat)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            compare(json.load(file), results)
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# braille_cells.py
+
+# Array-backed Braille: one uint8 dot mask per cell (bit 0 = dot 1 ... bit 7 = dot 8),
+# which is exactly the offset of the cell in the Unicode Braille block (U+2800 + mask).
+# NumPy is only needed by this module; the translators themselves do not use it.
+import numpy as np
+
+import braille_translator
+from braille_translator import CAPITAL_SIGN, NUMBER_SIGN, translate_to_grade2_braille, translate_from_braille
+
+BRAILLE_BLOCK = 0x2800
+
+# Every character str.split() treats as a word break (they all become blank cells)
+WHITESPACE_CODES = np.array([code for code in range(0x3001) if chr(code).isspace()], dtype='<u4')
+
+# Dot masks of the signs
+CAPITAL_MASK = ord(CAPITAL_SIGN) - BRAILLE_BLOCK
+NUMBER_MASK = ord(NUMBER_SIGN) - BRAILLE_BLOCK
+
+# Lookup tables, filled in by rebuild_cell_tables()
+_LETTER_CELLS = None   # ASCII code -> mask (Grade 1 layer)
+_LETTER_MAPPED = None  # ASCII code -> True if the character has a cell
+_CELL_LETTERS = None   # mask -> ASCII code of its letter (0 = none)
+_CELL_DIGITS = None    # mask -> ASCII code of its digit (0 = none)
+
+
+def _mask(cell):
+    return ord(cell) - BRAILLE_BLOCK
+
+
+def rebuild_cell_tables():
+    """
+    Rebuilds the lookup tables from GRADE1_BRAILLE and BRAILLE_NUMBERS.
+    Call this after editing either table at runtime.
+    """
+    global _LETTER_CELLS, _LETTER_MAPPED, _CELL_LETTERS, _CELL_DIGITS
+    letter_cells = np.zeros(128, dtype=np.uint8)
+    letter_mapped = np.zeros(128, dtype=bool)
+    cell_letters = np.zeros(256, dtype=np.uint8)
+    cell_digits = np.zeros(256, dtype=np.uint8)
+
+    for char, cell in braille_translator.GRADE1_BRAILLE.items():
+        letter_cells[ord(char)] = _mask(cell)
+        letter_mapped[ord(char)] = True
+        cell_letters[_mask(cell)] = ord(char)
+    for digit, cell in braille_translator.BRAILLE_NUMBERS.items():
+        letter_cells[ord(digit)] = _mask(cell)
+        letter_mapped[ord(digit)] = True
+        cell_digits[_mask(cell)] = ord(digit)
+
+    _LETTER_CELLS, _LETTER_MAPPED = letter_cells, letter_mapped
+    _CELL_LETTERS, _CELL_DIGITS = cell_letters, cell_digits
+
+
+def _code_points(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+
+
+def unicode_to_cells(braille_text):
+    """
+    Converts Unicode Braille into a cell array. Whitespace (spaces separate
+    words in the translators' output, line breaks and tabs are kept from the
+    input) becomes blank cells.
+
+    :param braille_text: A string of Unicode Braille characters and whitespace.
+    :return: A uint8 array of dot masks, one per character.
+    :raises ValueError: If the text holds anything else.
+    """
+    codes = _code_points(braille_text)
+    codes = np.where(np.isin(codes, WHITESPACE_CODES), BRAILLE_BLOCK, codes)
+    invalid = (codes < BRAILLE_BLOCK) | (codes > BRAILLE_BLOCK + 0xFF)
+    if invalid.any():
+        position = int(np.argmax(invalid))
+        raise ValueError(f"Not a Braille character at position {position}: {braille_text[position]!r}")
+    return (codes - BRAILLE_BLOCK).astype(np.uint8)
+
+
+def cells_to_unicode(cells, blank='⠀'):
+    """
+    Converts a cell array into Unicode Braille.
+
+    :param cells: A uint8 array of dot masks.
+    :param blank: Character for blank cells (pass ' ' to get text that
+        translate_from_braille splits into words).
+    :return: A string with one character per cell.
+    """
+    cells = np.asarray(cells, dtype=np.uint8)
+    codes = cells.astype('<u4') + BRAILLE_BLOCK
+    if blank != '⠀':
+        codes[cells == 0] = ord(blank)
+    return codes.tobytes().decode('utf-32-le')
+
+
+def text_to_cells(text):
+    """
+    Encodes English text as uncontracted (Grade 1) Braille cells in one table
+    lookup. Capital letters get a capital sign, each run of digits a number
+    sign; any whitespace becomes a blank cell and other characters without a
+    cell are dropped, like in the translators.
+
+    :param text: The English text.
+    :return: A uint8 array of dot masks.
+    """
+    codes = _code_points(text)
+    codes = np.where(np.isin(codes, WHITESPACE_CODES), ord(' '), codes)
+    upper = (codes >= ord('A')) & (codes <= ord('Z'))
+    codes = np.where(upper, codes + (ord('a') - ord('A')), codes)
+    ascii_codes = np.where(codes < 128, codes, 0)
+    mapped = _LETTER_MAPPED[ascii_codes] & (codes < 128)
+    upper &= mapped
+
+    digit = (codes >= ord('0')) & (codes <= ord('9'))
+    number_start = digit & ~np.concatenate(([False], digit[:-1]))
+
+    # Every character becomes an optional sign followed by its cell
+    pairs = np.empty((len(codes), 2), dtype=np.uint8)
+    pairs[:, 0] = np.where(upper, CAPITAL_MASK, NUMBER_MASK)
+    pairs[:, 1] = _LETTER_CELLS[ascii_codes]
+    keep = np.stack((upper | number_start, mapped), axis=1)
+    return pairs[keep]
+
+
+def cells_to_text(cells):
+    """
+    Decodes uncontracted (Grade 1) Braille cells back to English in one table
+    lookup: cells after a number sign read as digits until the first cell that
+    is not a digit, and a capital sign capitalizes the next letter.
+
+    :param cells: A uint8 array of dot masks.
+    :return: The English text.
+    """
+    cells = np.asarray(cells, dtype=np.uint8)
+    if not len(cells):
+        return ''
+
+    # A cell is in number mode if the last non-digit cell before it is a number sign
+    is_digit = _CELL_DIGITS[cells] != 0
+    last_break = np.maximum.accumulate(np.where(is_digit, -1, np.arange(len(cells))))
+    in_number = is_digit & (last_break >= 0) & (cells[np.maximum(last_break, 0)] == NUMBER_MASK)
+
+    capital = np.concatenate(([False], cells[:-1] == CAPITAL_MASK))
+    letters = _CELL_LETTERS[cells]
+    lowercase = (letters >= ord('a')) & (letters <= ord('z'))
+    letters = np.where(capital & lowercase, letters - (ord('a') - ord('A')), letters)
+    chars = np.where(in_number, _CELL_DIGITS[cells], letters).astype(np.uint8)
+
+    # The signs have no letter of their own, so they produce no text
+    keep = chars != 0
+    return chars[keep].tobytes().decode('ascii')
+
+
+def grade2_to_cells(text):
+    """
+    Translates English text to Grade 2 Braille (see translate_to_grade2_braille)
+    and returns it as a cell array, with word spaces as blank cells.
+
+    :param text: The English text.
+    :return: A uint8 array of dot masks.
+    """
+    return unicode_to_cells(translate_to_grade2_braille(text))
+
+
+def cells_to_grade2_text(cells):
+    """
+    Translates a Grade 2 cell array back to English (see translate_from_braille).
+
+    :param cells: A uint8 array of dot masks, words separated by blank cells.
+    :return: The English text.
+    """
+    return translate_from_braille(cells_to_unicode(cells, blank=' '))
+
+
+def cells_to_dots(cells):
+    """
+    Expands dot masks into one column per dot.
+
+    :param cells: A uint8 array of dot masks.
+    :return: A uint8 array of shape (cells, 8); column i is 1 where dot i + 1 is raised.
+    """
+    return np.unpackbits(np.asarray(cells, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+
+
+def dots_to_cells(dots):
+    """
+    Packs a (cells, 8) or (cells, 6) dot matrix back into dot masks.
+
+    :param dots: Array with one column per dot, non-zero where the dot is raised.
+    :return: A uint8 array of dot masks.
+    """
+    dots = np.asarray(dots) != 0
+    return np.packbits(dots, axis=1, bitorder='little')[:, 0]
+
+
+def device_buffer(cells):
+    """
+    Exposes a cell array as a memoryview of raw mask bytes, e.g. to hand to a
+    display driver's write(). No copy is made if the array is already a
+    contiguous uint8 array.
+
+    :param cells: A uint8 array of dot masks.
+    :return: A memoryview of the masks.
+    """
+    return memoryview(np.ascontiguousarray(cells, dtype=np.uint8))
+
+
+rebuild_cell_tables()
@@ -1,5 +1,14 @@
 # braille_translator.py
 
+import logging
+import threading
+from collections import Counter
+from functools import lru_cache, partial
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
 # Define Grade 1 Braille mappings (letters and basic punctuation)
 GRADE1_BRAILLE = {
     # Alphabets
@@ -26,6 +35,9 @@ BRAILLE_NUMBERS = {
 # Reverse the dictionary for decoding
 BRAILLE_TO_GRADE1 = {v: k for k, v in GRADE1_BRAILLE.items()}
 
+# Reverse the numbers for decoding
+BRAILLE_TO_DIGIT = {v: k for k, v in BRAILLE_NUMBERS.items()}
+
 # Define some common Grade 2 Braille contractions
 GRADE2_CONTRACTIONS = {
     'and': '⠯',
@@ -54,141 +66,359 @@ GRADE2_CONTRACTIONS = {
 # Reverse the contractions for decoding
 BRAILLE_TO_GRADE2 = {v: k for k, v in GRADE2_CONTRACTIONS.items()}
 
+# Marks the end of a contraction inside the trie below
+_TRIE_END = None
+
+def compile_contractions(contractions):
+    """
+    Compiles a contraction table into a character trie, so every contraction
+    starting at a position can be found in one walk instead of a sorted scan.
+
+    :param contractions: Dictionary mapping English strings to Braille.
+    :return: Nested dictionaries keyed by character; a node holding the
+        ``_TRIE_END`` key ends a contraction and stores its Braille.
+    """
+    trie = {}
+    for contraction, braille_cells in contractions.items():
+        node = trie
+        for char in contraction:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = braille_cells
+    return trie
+
+# Compiled once; call rebuild_contraction_tables() after editing GRADE2_CONTRACTIONS
+CONTRACTION_TRIE = compile_contractions(GRADE2_CONTRACTIONS)
+
+def rebuild_contraction_tables():
+    """
+    Recompiles the lookup tables derived from GRADE1_BRAILLE, BRAILLE_NUMBERS
+    and GRADE2_CONTRACTIONS, and empties the word caches.
+    """
+    global CONTRACTION_TRIE, BRAILLE_TO_GRADE1, BRAILLE_TO_DIGIT, BRAILLE_TO_GRADE2
+    CONTRACTION_TRIE = compile_contractions(GRADE2_CONTRACTIONS)
+    BRAILLE_TO_GRADE1 = {v: k for k, v in GRADE1_BRAILLE.items()}
+    BRAILLE_TO_DIGIT = {v: k for k, v in BRAILLE_NUMBERS.items()}
+    BRAILLE_TO_GRADE2 = {v: k for k, v in GRADE2_CONTRACTIONS.items()}
+    clear_word_caches()
+
+def _longest_contraction(word, start):
+    """
+    Finds the longest contraction starting at ``start`` that ends on a word
+    boundary (end of word or a non-alphabetic character).
+
+    :return: The end index of the match, or None if nothing matches.
+    """
+    node = CONTRACTION_TRIE
+    match_end = None
+    i = start
+    length = len(word)
+    while i < length:
+        node = node.get(word[i])
+        if node is None:
+            break
+        i += 1
+        if _TRIE_END in node and (i == length or not word[i].isalpha()):  # End boundary check
+            match_end = i
+    return match_end
+
 # Define the number sign in Braille
 NUMBER_SIGN = '⠼'
 
 # Define the capital sign in Braille
 CAPITAL_SIGN = '⠠'
 
-def translate_to_grade2_braille(text):
+# Optional tracing hook, called with one message per letter/contraction match.
+# Off by default; use set_trace(print) or set_trace(log_trace) to see the matches.
+TRACE = None
+
+def set_trace(callback):
+    """
+    Sets the default tracing hook used by the translators.
+
+    :param callback: A function taking a message string, or None to disable tracing.
+    """
+    global TRACE
+    TRACE = callback
+
+def log_trace(message):
+    """
+    Tracing hook that routes messages to this module's logger at DEBUG level.
+    """
+    logger.debug(message)
+
+def _encode_word(word, trace, stats=None):
+    """
+    Encodes one English word (no whitespace) as Braille cells.
+
+    :param word: The word to encode.
+    :param trace: Tracing hook or None.
+    :param stats: Optional Counter of contraction hits, letter fallbacks and unmapped characters.
+    :return: The Braille cells of the word.
+    """
+    word_braille = []
+    original_word = word  # Save original for debugging
+
+    # Handle numbers (Changed this as well (Galih))
+    if word.isdigit():
+        word_braille.append(NUMBER_SIGN)  # Add numeric mode indicator
+        for digit in word:
+            word_braille.append(BRAILLE_NUMBERS.get(digit, ''))
+        if stats is not None:
+            stats['numbers'] += 1
+        return ''.join(word_braille)
+
+    # Check if the word is capitalized
+    if word[0].isupper():
+        word_braille.append(CAPITAL_SIGN)
+        word = word.lower()
+
+    # Check if the entire word has a contraction
+    if word in GRADE2_CONTRACTIONS:
+        if trace:
+            trace(f"Word-level contraction found: '{original_word}' -> '{GRADE2_CONTRACTIONS[word]}'")
+        if stats is not None:
+            stats['contraction_hits'] += 1
+        word_braille.append(GRADE2_CONTRACTIONS[word])
+    else:
+        # Check for contractions within the word
+        i = 0
+        while i < len(word):
+            # Contractions only start on a word boundary
+            contraction_end = None
+            if i == 0 or not word[i - 1].isalpha():  # Start boundary check
+                contraction_end = _longest_contraction(word, i)
+            if contraction_end is not None:
+                contraction = word[i:contraction_end]
+                if trace:
+                    trace(f"Contraction match: '{contraction}' in '{original_word}' -> '{GRADE2_CONTRACTIONS[contraction]}'")
+                if stats is not None:
+                    stats['contraction_hits'] += 1
+                word_braille.append(GRADE2_CONTRACTIONS[contraction])
+                i = contraction_end
+            else:
+                # Map individual letters
+                char = word[i]
+                braille_char = GRADE1_BRAILLE.get(char, '')
+                if trace:
+                    if braille_char:
+                        trace(f"Letter match: '{char}' -> '{braille_char}'")
+                    else:
+                        trace(f"No Braille mapping for character: '{char}'")
+                if stats is not None:
+                    stats['letter_fallbacks' if braille_char else 'unmapped_characters'] += 1
+                word_braille.append(braille_char)
+                i += 1
+
+    return ''.join(word_braille)
+
+def translate_to_grade2_braille(text, trace=None):
     """
     Translates English text to a simplified version of Grade 2 Braille.
     This implementation handles a subset of Grade 2 contractions and numeric content.
 
     :param text: The English text to translate.
+    :param trace: Optional tracing hook (defaults to the one set with set_trace).
     :return: A string representing the translated Braille.
     """
-    braille = ''
-    words = text.split()
+    if trace is None:
+        trace = TRACE
+    if instrumentation.ENABLED:
+        return _instrumented_translate('encode', _encode_word, _cached_encode_word_stats, text.split(), trace)
+    if trace:
+        # Cached words would skip their trace messages
+        braille = [_encode_word(word, trace) for word in text.split()]
+    else:
+        encode_word = _cached_encode_word
+        braille = [encode_word(word) for word in text.split()]
 
-    for word in words:
-        word_braille = ''
-        original_word = word  # Save original for debugging
+    # Numbers are separated from subsequent letters by the word space
+    return ' '.join(braille).strip()
 
-        # Handle numbers (Changed this as well (Galih))
-        if word.isdigit():
-            word_braille += NUMBER_SIGN  # Add numeric mode indicator
-            for digit in word:
-                word_braille += BRAILLE_NUMBERS.get(digit, '')
+# Decoder states
+LETTER_MODE = 'letter'
+NUMBER_MODE = 'number'
+CAPITAL_PENDING = 'capital'
 
-        # Add space to separate numbers from subsequent letters
-            braille += word_braille + ' '  # Ensure a space follows numbers
+def _decode_word(word, trace, stats=None):
+    """
+    Decodes one Braille word in a single pass, switching between letter mode,
+    number mode (after NUMBER_SIGN) and a pending capital (after CAPITAL_SIGN).
+
+    :param word: The Braille cells of one word.
+    :param trace: Tracing hook or None.
+    :param stats: Optional Counter of contraction hits, letters, digits and unmapped cells.
+    :return: The English text of the word.
+    """
+    # Handle Grade 2 contractions (checked once per word, not per cell)
+    if word in BRAILLE_TO_GRADE2:
+        if trace:
+            trace(f"Word-level contraction found: '{word}' -> '{BRAILLE_TO_GRADE2[word]}'")
+        if stats is not None:
+            stats['contraction_hits'] += 1
+        return BRAILLE_TO_GRADE2[word]
+
+    word_text = []
+    state = LETTER_MODE
+    capitalized = False  # Flag to track capitalization
+
+    for cell in word:
+        if state == NUMBER_MODE:
+            digit = BRAILLE_TO_DIGIT.get(cell)
+            if digit is not None:
+                word_text.append(digit)
+                if stats is not None:
+                    stats['digits'] += 1
+                continue
+            # Any other cell ends the number and is decoded normally
+            state = LETTER_MODE
+
+        if state == CAPITAL_PENDING:
+            state = LETTER_MODE
+            contraction_text = BRAILLE_TO_GRADE2.get(cell)
+            if contraction_text is not None:
+                # Translate contraction after capital sign
+                word_text.append(contraction_text.capitalize())
+                if stats is not None:
+                    stats['contraction_hits'] += 1
+                continue
+            capitalized = True  # Set capital flag for next individual character
+        elif cell == CAPITAL_SIGN:
+            state = CAPITAL_PENDING
             continue
 
-        # Check if the word is capitalized
-        if word[0].isupper():
-            word_braille += CAPITAL_SIGN
-            word = word.lower()
+        if cell == NUMBER_SIGN:
+            state = NUMBER_MODE
+            continue
 
-        # Check if the entire word has a contraction
-        if word in GRADE2_CONTRACTIONS:
-            print(f"Word-level contraction found: '{original_word}' -> '{GRADE2_CONTRACTIONS[word]}'")
-            word_braille += GRADE2_CONTRACTIONS[word]
+        # Decode individual letters (Grade 1 Braille)
+        char_text = BRAILLE_TO_GRADE1.get(cell)
+        if char_text:
+            # Apply capitalization if the flag is set
+            if capitalized:
+                char_text = char_text.upper()
+                capitalized = False  # Reset capitalization after applying
+            word_text.append(char_text)
+            if stats is not None:
+                stats['letters'] += 1
         else:
-            # Check for contractions within the word
-            i = 0
-            while i < len(word):
-                contraction_found = False
-                for contraction in sorted(GRADE2_CONTRACTIONS.keys(), key=lambda x: len(x), reverse=True):
-                    contraction_end = i + len(contraction)
-                    # Match contraction only if it fits completely and is bounded (I chaged this abit (Galih))
-                    if (
-                        word[i:contraction_end] == contraction
-                        and (i == 0 or not word[i - 1].isalpha())  # Start boundary check
-                        and (contraction_end == len(word) or not word[contraction_end].isalpha())  # End boundary check
-                    ):
-                        # Log contraction match
-                        print(f"Contraction match: '{word[i:contraction_end]}' in '{original_word}' -> '{GRADE2_CONTRACTIONS[contraction]}'")
-                        word_braille += GRADE2_CONTRACTIONS[contraction]
-                        i += len(contraction)
-                        contraction_found = True
-                        break
-                if not contraction_found:
-                    # Map individual letters
-                    char = word[i]
-                    braille_char = GRADE1_BRAILLE.get(char, '')
-                    if braille_char:
-                        print(f"Letter match: '{char}' -> '{braille_char}'")
-                    else:
-                        print(f"No Braille mapping for character: '{char}'")
-                    word_braille += braille_char
-                    i += 1
-
-        braille += word_braille + ' '
+            if trace:
+                trace(f"No English mapping for Braille character: '{cell}'")
+            if stats is not None:
+                stats['unmapped_cells'] += 1
 
-    return braille.strip()
+    # A trailing capital sign has nothing to capitalize and is dropped
+    return ''.join(word_text)
 
-def translate_from_braille(braille_text):
+def translate_from_braille(braille_text, trace=None):
     """
     Translates Braille text back to English, handling Grade 2 contractions on a word basis.
     If a word doesn't match a Grade 2 contraction, it is translated letter-by-letter (Grade 1).
 
     :param braille_text: The Braille text to translate.
+    :param trace: Optional tracing hook (defaults to the one set with set_trace).
     :return: A string representing the English translation.
     """
-    text = ''
+    if trace is None:
+        trace = TRACE
     words = braille_text.split(' ')  # Use space to split words
+    if instrumentation.ENABLED:
+        return _instrumented_translate('decode', _decode_word, _cached_decode_word_stats, words, trace)
+    if trace:
+        text = [_decode_word(word, trace) for word in words]
+    else:
+        decode_word = _cached_decode_word
+        text = [decode_word(word) for word in words]
+    return ' '.join(text).strip()
 
-    for word in words:
-        word_text = ''
-        i = 0  # Initialize character pointer
-        capitalized = False  # Flag to track capitalization
+def _instrumented_translate(direction, translate_word, cached_with_stats, words, trace):
+    """
+    Translation that times the stage and counts what it needed. Untraced words
+    go through a word cache holding each word's counters next to its
+    translation, so the timer measures the cached path and the counters still
+    add up over every word of the text; cache hits and misses are counted too.
+    """
+    stats = Counter()
+    with instrumentation.timer(f"braille_{direction}"):
+        if trace:
+            translated = [translate_word(word, trace, stats) for word in words]
+        else:
+            _instrumented_misses.count = 0
+            translated = []
+            for word in words:
+                output, word_stats = cached_with_stats(word)
+                translated.append(output)
+                for name, amount in word_stats:
+                    stats[name] += amount
+            misses = _instrumented_misses.count
+            stats['cache_hits'] += len(words) - misses
+            stats['cache_misses'] += misses
+        result = ' '.join(translated).strip()
+    for name, amount in stats.items():
+        instrumentation.count(f"{direction}.{name}", amount)
+    return result
 
-        while i < len(word):
-            # Check for capital sign
-            # Handle capital sign
-            if word[i] == CAPITAL_SIGN:
-                i += 1  # Move to the next character
-                if word[i] in BRAILLE_TO_GRADE2:
-                    # Translate contraction after capital sign
-                    contraction_text = BRAILLE_TO_GRADE2[word[i]]
-                    word_text += contraction_text.capitalize()  # Capitalize the contraction
-                    i += 1  # Skip the contraction character
-                    continue
-                else:
-                    capitalized = True  # Set capital flag for next individual character   
-
-            # Check for number sign
-            if word[i] == NUMBER_SIGN:
-                i += 1
-                while i < len(word) and word[i] in BRAILLE_NUMBERS.values():
-                    for digit, braille_char in BRAILLE_NUMBERS.items():
-                        if word[i] == braille_char:
-                            word_text += digit
-                            break
-                    i += 1
-                continue
+# Misses of the instrumented word caches, counted per thread so concurrent
+# translations do not see each other's
+_instrumented_misses = threading.local()
 
-            # Handle Grade 2 contractions
-            if word in BRAILLE_TO_GRADE2:
-                print(f"Word-level contraction found: '{word}' -> '{BRAILLE_TO_GRADE2[word]}'")
-                word_text = BRAILLE_TO_GRADE2[word]
-                capitalized = False  # Reset capitalization after applying
-                break  # Move to the next word
-
-            # Decode individual letters (Grade 1 Braille)
-            char_braille = word[i]
-            char_text = BRAILLE_TO_GRADE1.get(char_braille, None)
-            if char_text:
-                # Apply capitalization if the flag is set
-                if capitalized:
-                    char_text = char_text.upper()
-                    capitalized = False  # Reset capitalization after applying
-                word_text += char_text
-            else:
-                print(f"No English mapping for Braille character: '{char_braille}'")
-            i += 1
+def _translate_with_stats(translate_word, word):
+    # Only runs on a cache miss, in the thread asking for the word
+    _instrumented_misses.count += 1
+    stats = Counter()
+    return translate_word(word, None, stats), tuple(stats.items())
+
+# Word-level LRU caches (untraced calls only); most words in real text repeat
+WORD_CACHE_SIZE = 8192
+
+def set_word_cache_size(maxsize):
+    """
+    Replaces the word caches with empty ones of a new capacity.
+
+    :param maxsize: Maximum number of cached words per direction (None for unbounded).
+    """
+    global WORD_CACHE_SIZE, _cached_encode_word, _cached_decode_word
+    global _cached_encode_word_stats, _cached_decode_word_stats
+    WORD_CACHE_SIZE = maxsize
+    _cached_encode_word = lru_cache(maxsize=maxsize)(partial(_encode_word, trace=None))
+    _cached_decode_word = lru_cache(maxsize=maxsize)(partial(_decode_word, trace=None))
+    # Used instead while instrumentation is on: (translation, counters) per word
+    _cached_encode_word_stats = lru_cache(maxsize=maxsize)(partial(_translate_with_stats, _encode_word))
+    _cached_decode_word_stats = lru_cache(maxsize=maxsize)(partial(_translate_with_stats, _decode_word))
 
-        text += word_text + ' '
+def word_cache_info():
+    """
+    :return: Dictionary with the hit/miss statistics of the 'encode' and 'decode' caches.
+    """
+    return {
+        'encode': _cached_encode_word.cache_info(),
+        'decode': _cached_decode_word.cache_info(),
+    }
+
+def clear_word_caches():
+    """
+    Empties the word caches (done automatically by rebuild_contraction_tables).
+    """
+    _cached_encode_word.cache_clear()
+    _cached_decode_word.cache_clear()
+    _cached_encode_word_stats.cache_clear()
+    _cached_decode_word_stats.cache_clear()
+
+def encode_word(word):
+    """
+    Encodes one English word (no whitespace) through the word cache.
+
+    :param word: The word to encode.
+    :return: The Braille cells of the word.
+    """
+    return _cached_encode_word(word)
+
+def decode_word(word):
+    """
+    Decodes one Braille word (no spaces) through the word cache.
+
+    :param word: The Braille cells of one word.
+    :return: The English text of the word.
+    """
+    return _cached_decode_word(word)
 
-    return text.strip()
+set_word_cache_size(WORD_CACHE_SIZE)
@@ -13,15 +13,39 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from braille_translator import translate_to_grade2_braille, translate_from_braille #same here
 from pathlib import Path
 from tkinter import Tk, Canvas, Entry, Text, Button, PhotoImage
-from cfg import read_pos_files, construct_grammar, preprocess_sentence, custom_tokenize
-from nltk import CFG, ChartParser
+from cfg import preprocess_sentence, custom_tokenize
+from incremental import incremental_encoder, incremental_decoder
+from io import StringIO
+import queue
+import threading
+import time
+import instrumentation
 
 # Now im adding a parent directory to the python module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+# Per-stage timings if BRAILLE_TRANSLATOR_INSTRUMENTATION is 'log' or 'json'
+instrumentation.enable_from_environment()
+
 # Now we define grammar directory
 grammar_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "grammar"))
 
+# Only this many parse trees are rendered in the detailed log
+MAX_TREES_SHOWN = 5
+
+# Parsing is given up after this many seconds
+PARSE_TIMEOUT_SECONDS = 10
+
+# How often the Tk main loop checks on the background parse
+POLL_INTERVAL_MS = 50
+
+# While typing, the sentence is parsed once the user pauses this long
+LIVE_PARSE_DELAY_MS = 300
+
+# Live translation: only the words touched by an edit are translated again
+live_encoder = incremental_encoder()
+live_decoder = incremental_decoder()
+
 OUTPUT_PATH = Path(__file__).parent
 ASSETS_PATH = OUTPUT_PATH / Path(r"C:\JohnDoe\braille-translator\build\assets\frame0") # change this to the correct frame0 path on your machine
 
@@ -32,10 +56,12 @@ def relative_to_assets(path: str) -> Path:
 # Function to append Braille characters to the input field (Helps in the left side of th translation :)
 def append_braille_character(char):
     entry_1.insert("end", char)
+    live_braille_to_text()
 
 # Function to handle spacebar button click
 def add_space():
     entry_1.insert("end", " ")
+    live_braille_to_text()
 
 # Function to append a number and add the ⠼ prefix if needed
 def append_braille_number(number_char):
@@ -43,6 +69,44 @@ def append_braille_number(number_char):
     if "⠼" not in current_text or not current_text.endswith(tuple("⠚⠁⠃⠉⠙⠑⠋⠛⠓⠊")):
         entry_1.insert("end", "⠼")
     entry_1.insert("end", number_char)
+    live_braille_to_text()
+
+# Updates the English output as the Braille input changes (keypad or typing)
+def live_braille_to_text(event=None):
+    english_translation = live_decoder.update(entry_1.get())
+    if english_translation != entry_4.get():
+        entry_4.delete(0, "end")
+        entry_4.insert(0, english_translation)
+
+# The text that was last handed to the parser while typing, and the pending parse
+live_parsed_text = None
+live_parse_timer = None
+
+# Updates the Braille output as the English input changes, then parses once typing pauses
+def live_text_to_braille(event=None):
+    global live_parse_timer, live_parsed_text
+    text = entry_3.get()
+    braille_translation = live_encoder.update(preprocess_sentence(text))
+    if braille_translation != entry_2.get():
+        entry_2.delete(0, "end")
+        entry_2.insert(0, braille_translation)
+
+    # A parse of the old text would only overwrite this translation later
+    if current_job is not None and current_job[3] != text:
+        cancel_parse()
+        live_parsed_text = None
+
+    if live_parse_timer is not None:
+        window.after_cancel(live_parse_timer)
+        live_parse_timer = None
+    if text != live_parsed_text and text.strip():
+        live_parse_timer = window.after(LIVE_PARSE_DELAY_MS, live_parse)
+
+def live_parse():
+    global live_parse_timer, live_parsed_text
+    live_parse_timer = None
+    live_parsed_text = entry_3.get()
+    parse_and_translate()
 
 # Function to translate Braille input to English (maybe have to dix later)
 def translate_braille_to_text():
@@ -58,52 +122,133 @@ def translate_braille_to_text():
         entry_4.delete(0, "end")
         entry_4.insert(0, f"Error: {e}")
 
-# Now im making a function to parse and translate the input sesntence
-def parse_and_translate():
-    sentence = entry_3.get()  # Fetch input from the text-to-braille field
+# Loads NLTK and the grammar in the background so the window shows up straight away
+def warm_parser():
     try:
-        # Read terminal words from grammar files
-        lexicon = read_pos_files(grammar_dir)
-        grammar_string = construct_grammar(lexicon)
-        grammar = CFG.fromstring(grammar_string)
-        parser = ChartParser(grammar)
+        from grammar_loader import load_grammar
+        load_grammar(grammar_dir)
+    except Exception:
+        pass  # The first parse request reports the error
+
+# Forest of the last sentence parsed; the next parse reuses its chart for the unchanged start
+last_forest = None
+
+# Parses and translates one sentence (runs on a background thread, never touches Tk)
+def run_parse_job(sentence, cancel, results):
+    global last_forest
+    # Imported here so NLTK is not loaded before the window is up
+    from grammar_loader import load_grammar
+    from lexicon import make_parser, ParseCancelled
+    from forest import cached_parse_forest
+
+    try:
+        # Grammar is built once and reused; the parser checks `cancel` as it works
+        parser = make_parser(load_grammar(grammar_dir), cancel)
 
         # Preprocess and tokenize the sentence
         sentence = preprocess_sentence(sentence)
         tokens = custom_tokenize(sentence)
 
-        # Parse the sentence to get parse trees
-        parse_trees = list(parser.parse(tokens))
+        # Parse the sentence into a packed forest (no tree enumeration yet)
+        forest = cached_parse_forest(parser, tokens, last_forest)
+        last_forest = forest
 
-        if not parse_trees:
-            detailed_log.delete("1.0", "end")
-            detailed_log.insert("1.0", "No valid parse trees found.")
+        if not forest.is_grammatical():
+            results.put(("error", "No valid parse trees found."))
             return
 
-        # Prepare parse tree output for the detailed log
+        # Prepare parse tree output for the detailed log (first few trees only)
+        tree_count = forest.count()
         detailed_output = f"Tokens: {tokens}\n\n"
-        for idx, tree in enumerate(parse_trees, 1):
+        if tree_count > MAX_TREES_SHOWN:
+            detailed_output += f"Showing {MAX_TREES_SHOWN} of {tree_count} parse trees.\n\n"
+        for idx, tree in enumerate(forest.trees(MAX_TREES_SHOWN), 1):
+            if cancel.is_set():
+                raise ParseCancelled()
             detailed_output += f"Parse Tree {idx}:\n"
-            
+
             # Render the tree visually and capture it in a string format
-            from io import StringIO
             tree_output = StringIO()
-            tree.pretty_print(stream=tree_output)
+            with instrumentation.timer('tree_render'):
+                tree.pretty_print(stream=tree_output)
             detailed_output += tree_output.getvalue() + "\n"
 
-        # Display parse trees in the detailed log
-        detailed_log.delete("1.0", "end")
-        detailed_log.insert("1.0", detailed_output)
-
         # Generate Braille translation
         braille_translation = translate_to_grade2_braille(sentence)
-        entry_2.delete(0, "end")  # Clear entry_2 for new Braille translation
-        entry_2.insert(0, braille_translation.strip())  # Add Braille translation
+        results.put(("ok", detailed_output, braille_translation.strip()))
 
+    except ParseCancelled:
+        results.put(("cancelled",))
     except Exception as e:
-        # Show error in detailed log
-        detailed_log.delete("1.0", "end")
-        detailed_log.insert("1.0", f"Error: {e}")
+        results.put(("error", f"Error: {e}"))
+    finally:
+        # One summary record per translation request
+        if instrumentation.ENABLED:
+            instrumentation.flush()
+
+# The job currently running in the background: (cancel event, result queue, start time, sentence)
+current_job = None
+
+def show_detailed_log(text):
+    detailed_log.delete("1.0", "end")
+    detailed_log.insert("1.0", text)
+
+# Now im making a function to parse and translate the input sesntence
+def parse_and_translate():
+    global current_job
+    # A new request replaces whatever is still running
+    if current_job is not None:
+        current_job[0].set()
+
+    sentence = entry_3.get()  # Fetch input from the text-to-braille field
+    cancel = threading.Event()
+    results = queue.Queue()
+    threading.Thread(target=run_parse_job, args=(sentence, cancel, results), daemon=True).start()
+
+    current_job = (cancel, results, time.monotonic(), sentence)
+    show_detailed_log("Parsing\u2026")
+    window.after(POLL_INTERVAL_MS, poll_parse_job, current_job)
+
+# Checks the background job from the Tk main loop (results are posted back via window.after)
+def poll_parse_job(job):
+    global current_job
+    if job is not current_job:
+        return  # Cancelled or replaced by a newer request
+
+    cancel, results, started, sentence = job
+    try:
+        result = results.get_nowait()
+    except queue.Empty:
+        elapsed = time.monotonic() - started
+        if elapsed > PARSE_TIMEOUT_SECONDS:
+            cancel.set()
+            current_job = None
+            show_detailed_log(f"Parsing timed out after {PARSE_TIMEOUT_SECONDS} seconds.")
+            return
+        show_detailed_log(f"Parsing\u2026 ({elapsed:.1f}s)")
+        window.after(POLL_INTERVAL_MS, poll_parse_job, job)
+        return
+
+    current_job = None
+    if result[0] == "ok":
+        show_detailed_log(result[1])
+        # Keep the live translation if the input was edited while parsing
+        if entry_3.get() == sentence:
+            entry_2.delete(0, "end")  # Clear entry_2 for new Braille translation
+            entry_2.insert(0, result[2])  # Add Braille translation
+    elif result[0] == "cancelled":
+        show_detailed_log("Parsing cancelled.")
+    else:
+        show_detailed_log(result[1])
+
+# Stops the running parse (the worker thread notices at its next chart edge)
+def cancel_parse():
+    global current_job
+    if current_job is None:
+        return
+    current_job[0].set()
+    current_job = None
+    show_detailed_log("Parsing cancelled.")
 
 # The copy function specified to each entry (Idk experienced errors)
 def copy_from_entry_4():
@@ -988,5 +1133,29 @@ detailed_log.place(
     height=200.0
 )
 
+# Stops a long-running parse
+cancel_button = Button(
+    window,
+    text="Cancel",
+    borderwidth=0,
+    highlightthickness=0,
+    command=cancel_parse,
+    relief="flat"
+)
+cancel_button.place(
+    x=723.0,
+    y=710.0,
+    width=625.0,
+    height=30.0
+)
+
+# Translate as the user types (the buttons still work as before)
+entry_1.bind("<KeyRelease>", live_braille_to_text)
+entry_3.bind("<KeyRelease>", live_text_to_braille)
+
 window.resizable(False, False)
+
+# Start loading the parser once the window has been drawn
+window.after_idle(lambda: threading.Thread(target=warm_parser, daemon=True).start())
+
 window.mainloop()
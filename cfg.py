@@ -1,46 +1,52 @@
 import os
-import nltk
-from nltk import CFG
-from nltk.parse import ChartParser
 import re
 
+# NLTK is only imported once a sentence is actually parsed (see parse_sentence and
+# grammar_loader), so translation-only users of this module start up quickly
+
 # Import the Text to Braille translator
 from braille_translator import translate_to_grade2_braille
 
 # Import the Braille to Text translator
 from braille_translator import translate_from_braille
 
-def read_pos_files(grammar_dir):
+# Tracing is off by default in the translators
+from braille_translator import set_trace
+
+# Opt-in per-stage timers and counters (no-ops unless enabled)
+import instrumentation
+from instrumentation import timer
+
+# Non-terminal -> POS file holding its terminal words
+POS_FILES = {
+    'Vi': 'Vi.txt',
+    'Vt': 'Vt.txt',
+    'DT': 'DT.txt',
+    'NN': 'NN.txt',
+    'PRP': 'PRP.txt',
+    'PRE': 'PRE.txt',
+    'Aux': 'Axv.txt',
+    'Adv': 'Adv.txt',
+    'CONJ': 'CONJ.txt',
+    'NUM':  'NUM.txt',
+    'NEG': 'NEG.txt',
+    'Adj': 'Adj.txt',
+}
+
+def read_pos_words(grammar_dir):
     """
-    Reads terminal words from separate POS files within the grammar directory.
+    Reads the raw terminal words from separate POS files within the grammar directory.
 
     :param grammar_dir: Path to the directory containing POS .txt files.
-    :return: Dictionary mapping non-terminals to lists of terminal words.
+    :return: Dictionary mapping non-terminals to lists of unquoted words.
     """
-    pos_files = {
-        'Vi': 'Vi.txt',
-        'Vt': 'Vt.txt',
-        'DT': 'DT.txt',
-        'NN': 'NN.txt',
-        'PRP': 'PRP.txt',
-        'PRE': 'PRE.txt',
-        'Aux': 'Axv.txt',
-        'Adv': 'Adv.txt',
-        'CONJ': 'CONJ.txt',
-        'NUM':  'NUM.txt',
-        'NEG': 'NEG.txt',
-        'Adj': 'Adj.txt',
-    }
-
     lexicon = {}
 
-    for non_terminal, filename in pos_files.items():
+    for non_terminal, filename in POS_FILES.items():
         file_path = os.path.join(grammar_dir, filename)
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
-                words = [line.strip() for line in file if line.strip()]
-                quoted_words = [f"'{word}' | '{word.capitalize()}'" for word in words]
-                lexicon[non_terminal] = quoted_words
+                lexicon[non_terminal] = [line.strip() for line in file if line.strip()]
         except FileNotFoundError:
             print(f"Error: {filename} not found in {grammar_dir}.")
             exit(1)
@@ -50,6 +56,21 @@ def read_pos_files(grammar_dir):
 
     return lexicon
 
+def read_pos_files(grammar_dir):
+    """
+    Reads terminal words from separate POS files within the grammar directory.
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :return: Dictionary mapping non-terminals to lists of terminal words.
+    """
+    lexicon = {}
+
+    for non_terminal, words in read_pos_words(grammar_dir).items():
+        quoted_words = [f"'{word}' | '{word.capitalize()}'" for word in words]
+        lexicon[non_terminal] = quoted_words
+
+    return lexicon
+
 def construct_grammar(lexicon):
     """
     Constructs the CFG grammar string by combining fixed rules with terminal words.
@@ -113,7 +134,8 @@ def preprocess_sentence(sentence):
     """
     Preprocesses a sentence to ensure numbers are separated and properly tokenized.
     """
-    sentence = re.sub(r'(\d+)', r' \1 ', sentence)
+    with timer('preprocess'):
+        sentence = re.sub(r'(\d+)', r' \1 ', sentence)
     return sentence
 
 def custom_tokenize(sentence):
@@ -125,19 +147,21 @@ def custom_tokenize(sentence):
     :return: A list of tokens.
     """
     tokens = []
-    for word in sentence.split():
-        if word.isdigit():  # Check if the word is a multi-digit number
-            tokens.extend(list(word))  # Split digits into individual tokens
-        else:
-            tokens.append(word)  # Add non-digit words as-is
+    with timer('tokenize'):
+        for word in sentence.split():
+            if word.isdigit():  # Check if the word is a multi-digit number
+                tokens.extend(list(word))  # Split digits into individual tokens
+            else:
+                tokens.append(word)  # Add non-digit words as-is
     return tokens
 
-def parse_sentence(parser, sentence):
+def parse_sentence(parser, sentence, max_trees=10):
     """
-    Parses a sentence and prints all possible parse trees.
+    Parses a sentence and prints its parse trees.
 
     :param parser: An NLTK parser object.
     :param sentence: A string representing the sentence to parse.
+    :param max_trees: Print at most this many trees (None prints all of them).
     :return: Parsed sentence as a string.
     """
     # Preprocess the sentence to handle numbers correctly
@@ -147,21 +171,24 @@ def parse_sentence(parser, sentence):
     tokens = custom_tokenize(sentence)  # Use custom tokenizer
     print(f"\nParsing sentence: '{sentence}'")
     print(f"\nTokenized sentence: {tokens}")
-    parse_trees = list(parser.parse(tokens))
 
     try:
-        parse_trees = list(parser.parse(tokens))
+        # Build the packed forest once; trees are only expanded when printed
+        from forest import cached_parse_forest
+        forest = cached_parse_forest(parser, tokens)
     except Exception as e:
         print(f"Error parsing sentence: {e}")
         return None
 
-    if not parse_trees:
+    if not forest.is_grammatical():
         print("No parse trees found.")
         return None
     else:
-        for idx, tree in enumerate(parse_trees, 1):
+        print(f"\nNumber of parse trees: {forest.count()}")
+        for idx, tree in enumerate(forest.trees(max_trees), 1):
             print(f"\nParse Tree {idx}:")
-            print(tree)
+            with timer('tree_render'):
+                print(tree)
             # tree.draw()
         return sentence  # Return the sentence for translation
 
@@ -169,27 +196,23 @@ def main():
     # Ensure NLTK data is downloaded
     # nltk.download('punkt')
 
-    # Define the path to the grammar directory
-    grammar_dir = os.path.join(os.getcwd(), 'grammar')
+    # Show every letter/contraction match in the demo output
+    set_trace(print)
 
-    # Read terminal words from POS files
-    lexicon = read_pos_files(grammar_dir)
+    # Per-stage timings if BRAILLE_TRANSLATOR_INSTRUMENTATION is 'log' or 'json'
+    instrumentation.enable_from_environment()
 
-    # Construct the grammar string
-    grammar_string = construct_grammar(lexicon)
-    print("Constructed Grammar:\n")
-    print(grammar_string)
+    # Define the path to the grammar directory
+    grammar_dir = os.path.join(os.getcwd(), 'grammar')
 
-    # Create CFG
+    # Load the grammar and parser (built once, then reused from the on-disk cache)
+    from grammar_loader import get_parser
     try:
-        grammar = CFG.fromstring(grammar_string)
+        parser = get_parser(grammar_dir)
     except Exception as e:
         print(f"Error constructing CFG: {e}")
         exit(1)
 
-    # Initialize the parser
-    parser = ChartParser(grammar)
-
     # Define sample sentences
     sentences = [
         # S -> NP VP
@@ -271,6 +294,9 @@ def main():
         translated_text = translate_from_braille(braille_text)
         print(f"Translated Text: {translated_text}\n")
 
+    if instrumentation.ENABLED:
+        instrumentation.flush()
+
 if __name__ == "__main__":
     main()
     
\ No newline at end of file
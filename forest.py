@@ -0,0 +1,214 @@
+# forest.py
+
+import threading
+from collections import OrderedDict, namedtuple
+from itertools import islice
+
+from nltk import Tree
+from nltk.parse.chart import LeafEdge
+
+import instrumentation
+
+
+class ParseForest:
+    """
+    The shared packed parse forest of a sentence, read straight off the
+    parser's chart. Each chart edge stores every way of building it (its child
+    pointer lists) once, so recognising, counting and iterating trees never has
+    to expand the exponential number of derivations up front.
+    """
+
+    def __init__(self, parser, tokens, previous=None):
+        """
+        Runs the chart parser once (polynomial in the sentence length).
+
+        :param parser: An NLTK ChartParser.
+        :param tokens: The tokens to parse.
+        :param previous: Optional forest of an earlier version of the sentence;
+            the chart edges over their common leading tokens are reused.
+        """
+        self.tokens = list(tokens)
+        self.grammar = parser.grammar()
+        with instrumentation.timer('chart_parse'):
+            if (previous is not None and previous.grammar is self.grammar
+                    and hasattr(parser, 'chart_parse_incremental')):
+                self.chart = parser.chart_parse_incremental(previous.chart, self.tokens)
+            else:
+                self.chart = parser.chart_parse(self.tokens)
+        instrumentation.count('chart_edges', self.chart.num_edges())
+        start = self.grammar.start()
+        self.roots = list(self.chart.select(
+            start=0, end=self.chart.num_leaves(), lhs=start, is_complete=True
+        ))
+        self._counts = {}
+
+    def is_grammatical(self):
+        """
+        :return: True if at least one complete parse spans all tokens.
+        """
+        return bool(self.roots)
+
+    def count(self):
+        """
+        Counts the parse trees without building them.
+
+        :return: The number of distinct parse trees.
+        """
+        return sum(self._count(edge, frozenset()) for edge in self.roots)
+
+    def _count(self, edge, in_progress):
+        if isinstance(edge, LeafEdge):
+            return 1
+        if edge in self._counts:
+            return self._counts[edge]
+        # An edge reached again through its own derivation would be a cyclic tree
+        if edge in in_progress:
+            return 0
+        in_progress = in_progress | {edge}
+        total = 0
+        for cpl in self.chart.child_pointer_lists(edge):
+            ways = 1
+            for child in cpl:
+                ways *= self._count(child, in_progress)
+                if not ways:
+                    break
+            total += ways
+        self._counts[edge] = total
+        return total
+
+    def trees(self, limit=None):
+        """
+        Lazily yields parse trees, one at a time.
+
+        :param limit: Stop after this many trees (default: all of them).
+        :return: An iterator of NLTK Trees.
+        """
+        trees = (tree for edge in self.roots for tree in self._trees(edge, frozenset()))
+        if instrumentation.ENABLED:
+            trees = _counted(trees)
+        return trees if limit is None else islice(trees, limit)
+
+    def _trees(self, edge, in_progress):
+        if isinstance(edge, LeafEdge):
+            yield self.chart.leaf(edge.start())
+            return
+        if edge in in_progress:
+            return
+        in_progress = in_progress | {edge}
+        label = edge.lhs().symbol()
+        for cpl in self.chart.child_pointer_lists(edge):
+            for children in self._combinations(cpl, 0, in_progress):
+                yield Tree(label, list(children))
+
+    def _combinations(self, cpl, index, in_progress):
+        # Lazy cartesian product of the children's trees
+        if index == len(cpl):
+            yield ()
+            return
+        for first in self._trees(cpl[index], in_progress):
+            for rest in self._combinations(cpl, index + 1, in_progress):
+                yield (first,) + rest
+
+
+def _counted(trees):
+    for tree in trees:
+        instrumentation.count('trees_enumerated')
+        yield tree
+
+
+def parse_forest(parser, tokens):
+    """
+    Parses tokens into a packed forest.
+
+    :param parser: An NLTK ChartParser.
+    :param tokens: The tokens to parse.
+    :return: A ParseForest.
+    """
+    return ParseForest(parser, tokens)
+
+
+def is_grammatical(parser, tokens):
+    """
+    Checks whether the tokens form a sentence without enumerating any tree.
+
+    :param parser: An NLTK ChartParser.
+    :param tokens: The tokens to parse.
+    :return: True if the sentence has at least one parse.
+    """
+    return ParseForest(parser, tokens).is_grammatical()
+
+
+# Sentence-level LRU cache: (grammar, token tuple) -> ParseForest
+PARSE_CACHE_SIZE = 256
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+_parse_cache = OrderedDict()
+_parse_cache_lock = threading.Lock()
+_parse_cache_hits = 0
+_parse_cache_misses = 0
+
+
+def cached_parse_forest(parser, tokens, previous=None):
+    """
+    Same as parse_forest, but remembers the most recently parsed sentences.
+    Entries are keyed by the parser's grammar, so a reloaded grammar never
+    sees forests built from the old one.
+
+    :param parser: An NLTK ChartParser.
+    :param tokens: The tokens to parse.
+    :param previous: Optional forest of an earlier version of the sentence,
+        reused on a cache miss (see ParseForest).
+    :return: A ParseForest (shared between callers parsing the same tokens).
+    """
+    global _parse_cache_hits, _parse_cache_misses
+    key = (parser.grammar(), tuple(tokens))
+    with _parse_cache_lock:
+        forest = _parse_cache.get(key)
+        if forest is not None:
+            _parse_cache.move_to_end(key)
+            _parse_cache_hits += 1
+            return forest
+        _parse_cache_misses += 1
+
+    # Parse outside the lock so other threads are not held up
+    forest = ParseForest(parser, key[1], previous)
+
+    with _parse_cache_lock:
+        _parse_cache[key] = forest
+        _parse_cache.move_to_end(key)
+        while PARSE_CACHE_SIZE is not None and len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return forest
+
+
+def set_parse_cache_size(maxsize):
+    """
+    Changes the capacity of the sentence cache, evicting the oldest entries if needed.
+
+    :param maxsize: Maximum number of cached sentences (None for unbounded).
+    """
+    global PARSE_CACHE_SIZE
+    with _parse_cache_lock:
+        PARSE_CACHE_SIZE = maxsize
+        while maxsize is not None and len(_parse_cache) > maxsize:
+            _parse_cache.popitem(last=False)
+
+
+def parse_cache_info():
+    """
+    :return: A CacheInfo with the hit/miss statistics of the sentence cache.
+    """
+    with _parse_cache_lock:
+        return CacheInfo(_parse_cache_hits, _parse_cache_misses, PARSE_CACHE_SIZE, len(_parse_cache))
+
+
+def clear_parse_cache():
+    """
+    Empties the sentence cache and resets its statistics.
+    """
+    global _parse_cache_hits, _parse_cache_misses
+    with _parse_cache_lock:
+        _parse_cache.clear()
+        _parse_cache_hits = 0
+        _parse_cache_misses = 0
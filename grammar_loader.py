@@ -0,0 +1,216 @@
+# grammar_loader.py
+
+import hashlib
+import logging
+import os
+import threading
+import weakref
+
+from cfg import POS_FILES, construct_grammar, read_pos_words
+from lexicon import read_lexicon, build_structural_grammar, make_parser
+from lexicon_binary import BinaryLexicon, write_binary_lexicon
+from forest import clear_parse_cache
+from instrumentation import timer
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the layout of the cached lexicon changes
+CACHE_FORMAT_VERSION = 4
+
+# Compiled lexicons live next to the POS files (already ignored by git)
+CACHE_DIRNAME = '__pycache__'
+
+# In-process cache: grammar_dir -> (file signature, digest, grammar, parser)
+_loaded = {}
+_load_lock = threading.Lock()
+
+# Every BinaryLexicon opened here that is still alive (its file must not be deleted)
+_mapped = weakref.WeakSet()
+
+
+def _file_signature(grammar_dir):
+    """
+    Cheap stat-based signature of the POS files, used to notice edits
+    without re-hashing every file on each call.
+    """
+    signature = []
+    for filename in sorted(POS_FILES.values()):
+        stat = os.stat(os.path.join(grammar_dir, filename))
+        signature.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def grammar_digest(grammar_dir):
+    """
+    Computes a content hash of the POS files and the fixed grammar rules.
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :return: Hex digest identifying this exact grammar.
+    """
+    digest = hashlib.sha256()
+    digest.update(str(CACHE_FORMAT_VERSION).encode())
+    # The structural rules are part of the grammar too
+    digest.update(construct_grammar({}).encode('utf-8'))
+    for non_terminal, filename in sorted(POS_FILES.items()):
+        digest.update(non_terminal.encode('utf-8'))
+        with open(os.path.join(grammar_dir, filename), 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def cache_path(grammar_dir, digest):
+    """
+    Returns the on-disk location of the compiled lexicon for a digest.
+    """
+    return os.path.join(grammar_dir, CACHE_DIRNAME, f"lexicon.{digest[:32]}.bin")
+
+
+def _read_cache(path):
+    try:
+        # Mapped, not loaded: lookups search the file in place
+        lexicon = BinaryLexicon(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable lexicon cache %s: %s", path, e)
+        return None
+    _mapped.add(lexicon)
+    return lexicon
+
+
+def _write_cache(path, lexicon_words):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_binary_lexicon(lexicon_words, path)
+        return True
+    except OSError as e:
+        logger.warning("Could not write lexicon cache %s: %s", path, e)
+        return False
+
+
+def _remove_stale_caches(path):
+    # Lexicons compiled from earlier versions of the POS files are never read
+    # again; keep only the current one and any this process still has mapped
+    cache_dir, current = os.path.split(path)
+    in_use = {os.path.abspath(lexicon.path) for lexicon in list(_mapped) if not lexicon.closed}
+    for name in os.listdir(cache_dir):
+        stale = os.path.join(cache_dir, name)
+        if (name != current and name.startswith('lexicon.') and name.endswith('.bin')
+                and os.path.abspath(stale) not in in_use):
+            try:
+                os.remove(stale)
+            except OSError as e:
+                # Another process may have it open (Windows refuses to delete it then)
+                logger.warning("Could not remove stale lexicon cache %s: %s", stale, e)
+
+
+def build_grammar(grammar_dir):
+    """
+    Builds the grammar from the POS files without touching any cache.
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :return: A LexiconCFG.
+    """
+    return build_structural_grammar(read_lexicon(grammar_dir))
+
+
+def load_grammar(grammar_dir, use_disk_cache=True):
+    """
+    Returns the grammar for a grammar directory, building it at most once per process.
+    The lexicon is compiled to a binary file keyed by the POS file hashes and
+    memory-mapped, so later processes skip the rebuild, all processes share one
+    copy of it, and any edit to a lexicon file invalidates it.
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :param use_disk_cache: Whether to read/write the compiled on-disk copy
+        (False keeps the whole lexicon in Python dictionaries instead).
+    :return: A LexiconCFG.
+    """
+    return _load(grammar_dir, use_disk_cache)[0]
+
+
+def get_parser(grammar_dir, use_disk_cache=True):
+    """
+    Returns a ChartParser for a grammar directory, shared across calls.
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :param use_disk_cache: Whether to read/write the compiled on-disk copy.
+    :return: An NLTK ChartParser.
+    """
+    return _load(grammar_dir, use_disk_cache)[1]
+
+
+def _load(grammar_dir, use_disk_cache):
+    # The GUI warms the parser on a thread while the first parse may already be
+    # loading it; without the lock both would build (and cache) their own copy
+    with _load_lock:
+        return _load_locked(grammar_dir, use_disk_cache)
+
+
+def _load_locked(grammar_dir, use_disk_cache):
+    grammar_dir = os.path.abspath(grammar_dir)
+    signature = _file_signature(grammar_dir)
+
+    cached = _loaded.get(grammar_dir)
+    if cached is not None and cached[0] == signature:
+        return cached[2], cached[3]
+
+    digest = grammar_digest(grammar_dir)
+    if cached is not None and cached[1] == digest:
+        # Files were touched but their contents did not change
+        _loaded[grammar_dir] = (signature,) + cached[1:]
+        return cached[2], cached[3]
+
+    with timer('lexicon_load'):
+        lexicon = None
+        written = False
+        path = cache_path(grammar_dir, digest)
+        if use_disk_cache:
+            lexicon = _read_cache(path)
+            if lexicon is None and _write_cache(path, read_pos_words(grammar_dir)):
+                lexicon = _read_cache(path)
+                written = True
+        if lexicon is None:
+            lexicon = read_lexicon(grammar_dir)
+
+    with timer('grammar_compile'):
+        grammar = build_structural_grammar(lexicon)
+        parser = make_parser(grammar)
+    if cached is not None:
+        # The grammar changed; forests parsed with the old one are stale
+        clear_parse_cache()
+    _loaded[grammar_dir] = (signature, digest, grammar, parser)
+    if written:
+        # Let go of the previous grammar first, so its file is only kept if a caller still uses it
+        cached = None
+        _remove_stale_caches(path)
+    return grammar, parser
+
+
+def _close(grammar):
+    # Unmap the lexicon file so it can be deleted (Windows refuses while mapped)
+    if isinstance(grammar.lexicon, BinaryLexicon):
+        grammar.lexicon.close()
+
+
+def clear_grammar_cache(grammar_dir=None, remove_files=False):
+    """
+    Forgets loaded grammars (and cached parses) so the next call rebuilds them.
+
+    :param grammar_dir: Only forget this directory (default: all of them).
+    :param remove_files: Also delete compiled lexicons stored on disk (grammars
+        returned earlier for these directories can no longer be used).
+    """
+    with _load_lock:
+        clear_parse_cache()
+        dirs = list(_loaded) if grammar_dir is None else [os.path.abspath(grammar_dir)]
+        for directory in dirs:
+            cached = _loaded.pop(directory, None)
+            if remove_files:
+                if cached is not None:
+                    _close(cached[2])
+                cache_dir = os.path.join(directory, CACHE_DIRNAME)
+                if os.path.isdir(cache_dir):
+                    for name in os.listdir(cache_dir):
+                        if name.startswith('lexicon.') and name.endswith('.bin'):
+                            os.remove(os.path.join(cache_dir, name))
@@ -0,0 +1,72 @@
+# incremental.py
+
+from braille_translator import encode_word, decode_word
+
+
+class IncrementalTranslator:
+    """
+    Re-translates a text that is being edited, one update at a time. Words
+    outside the edited region keep their previous translation, and the words
+    inside it go through the word caches, so an update costs about as much as
+    the words it touches.
+    """
+
+    def __init__(self, translate_word, separator=None):
+        """
+        :param translate_word: Function translating one word (encode_word or decode_word).
+        :param separator: What splits the text into words (None = any whitespace,
+            like translate_to_grade2_braille; ' ' like translate_from_braille).
+        """
+        self.translate_word = translate_word
+        self.separator = separator
+        self.words = []
+        self.translations = []
+        self.changed = 0  # Words translated by the last update
+
+    def update(self, text):
+        """
+        Translates the new version of the text.
+
+        :param text: The full current text.
+        :return: Its translation, the same as translating it from scratch.
+        """
+        words = text.split(self.separator)
+        old = self.words
+
+        # Words before and after the edit are unchanged
+        limit = min(len(words), len(old))
+        start = 0
+        while start < limit and words[start] == old[start]:
+            start += 1
+        end = 0
+        while end < limit - start and words[-1 - end] == old[-1 - end]:
+            end += 1
+
+        translate_word = self.translate_word
+        middle = [translate_word(word) for word in words[start:len(words) - end]]
+        self.translations[start:len(old) - end] = middle
+        self.words = words
+        self.changed = len(middle)
+        return ' '.join(self.translations).strip()
+
+    def reset(self):
+        """
+        Forgets the previous text.
+        """
+        self.words = []
+        self.translations = []
+        self.changed = 0
+
+
+def incremental_encoder():
+    """
+    :return: An IncrementalTranslator from English to Grade 2 Braille.
+    """
+    return IncrementalTranslator(encode_word)
+
+
+def incremental_decoder():
+    """
+    :return: An IncrementalTranslator from Braille to English.
+    """
+    return IncrementalTranslator(decode_word, separator=' ')
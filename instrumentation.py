@@ -0,0 +1,168 @@
+# instrumentation.py
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Checked by the instrumented code before doing any work; False means near-zero overhead
+ENABLED = False
+
+# Environment variable read by enable_from_environment() ('log' or 'json')
+ENVIRONMENT_VARIABLE = 'BRAILLE_TRANSLATOR_INSTRUMENTATION'
+
+_sink = None
+_lock = threading.Lock()
+_timers = {}    # stage -> [calls, total seconds]
+_counters = {}  # name -> total
+
+# Shared do-nothing context manager returned by timer() while disabled
+_NULL_TIMER = nullcontext()
+
+
+def log_sink(record):
+    """
+    Sink writing each record as one JSON log line at INFO level.
+    """
+    logger.info(json.dumps(record, sort_keys=True))
+
+
+def json_sink(stream=None):
+    """
+    Creates a sink writing each record as one JSON line to a stream.
+
+    :param stream: A text file object (default: stderr).
+    :return: A sink function.
+    """
+    def sink(record):
+        out = stream if stream is not None else sys.stderr
+        out.write(json.dumps(record, sort_keys=True) + '\n')
+        out.flush()
+    return sink
+
+
+def enable(sink=None):
+    """
+    Turns instrumentation on.
+
+    :param sink: Function called with each record (a dictionary): one
+        ``{'event': 'timer', ...}`` per finished timer and one
+        ``{'event': 'summary', ...}`` per flush(). None only aggregates,
+        read the totals with snapshot().
+    """
+    global ENABLED, _sink
+    _sink = sink
+    ENABLED = True
+
+
+def disable():
+    """
+    Turns instrumentation off (totals collected so far are kept until reset()).
+    """
+    global ENABLED, _sink
+    ENABLED = False
+    _sink = None
+
+
+def enable_from_environment():
+    """
+    Enables instrumentation if BRAILLE_TRANSLATOR_INSTRUMENTATION is 'log' or 'json'.
+
+    :return: True if instrumentation was enabled.
+    """
+    mode = os.environ.get(ENVIRONMENT_VARIABLE, '').strip().lower()
+    if mode == 'log':
+        enable(log_sink)
+    elif mode == 'json':
+        enable(json_sink())
+    else:
+        return False
+    return True
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        with _lock:
+            totals = _timers.setdefault(self.stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+        sink = _sink
+        if sink is not None:
+            sink({'event': 'timer', 'stage': self.stage, 'seconds': seconds})
+        return False
+
+
+def timer(stage):
+    """
+    Context manager timing one stage, e.g. ``with timer('chart_parse'): ...``.
+
+    :param stage: Name of the stage.
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(stage)
+
+
+def count(name, amount=1):
+    """
+    Adds to a counter (does nothing while disabled).
+
+    :param name: Name of the counter.
+    :param amount: How much to add.
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot():
+    """
+    :return: Dictionary with the per-stage timer totals and the counters.
+    """
+    with _lock:
+        return {
+            'timers': {stage: {'calls': calls, 'seconds': seconds}
+                       for stage, (calls, seconds) in _timers.items()},
+            'counters': dict(_counters),
+        }
+
+
+def reset():
+    """
+    Clears all timer totals and counters.
+    """
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def flush():
+    """
+    Sends a summary of everything collected since the last flush to the sink,
+    then resets the totals.
+
+    :return: The summary that was sent.
+    """
+    summary = snapshot()
+    summary['event'] = 'summary'
+    reset()
+    sink = _sink
+    if sink is not None:
+        sink(summary)
+    return summary
@@ -0,0 +1,358 @@
+# lexicon.py
+
+import time
+from collections import OrderedDict, namedtuple
+
+from nltk import CFG
+from nltk.grammar import Nonterminal
+from nltk.parse import ChartParser
+from nltk.parse.chart import (
+    AbstractChartRule,
+    BottomUpPredictCombineRule,
+    Chart,
+    EmptyPredictRule,
+    LeafEdge,
+    LeafInitRule,
+    SingleEdgeFundamentalRule,
+    TreeEdge,
+)
+
+from cfg import read_pos_words, construct_grammar
+
+
+# Marks the end of a phrase inside the phrase trie
+_PHRASE_END = None
+
+
+class Lexicon(namedtuple('Lexicon', ['index', 'phrases'])):
+    """
+    A lexicon compiled from the POS files: single words in a hash index,
+    multi-word entries ("ought to", "in front of") in a word-level trie.
+    ``lexicon_binary.BinaryLexicon`` offers the same two lookups.
+    """
+
+    __slots__ = ()
+
+    def tags(self, token):
+        """
+        :return: The POS tags (non-terminal names) the token can take.
+        """
+        return self.index.get(token.lower(), ())
+
+    def phrases_at(self, tokens, start):
+        """
+        Finds the multi-word entries starting at a token.
+
+        :param tokens: The tokens of the sentence.
+        :param start: Index of the first token of the phrase.
+        :return: A list of (end, tags) tuples, one per matching phrase.
+        """
+        matches = []
+        node = self.phrases
+        for end in range(start, len(tokens)):
+            node = node.get(tokens[end].lower())
+            if node is None:
+                break
+            if _PHRASE_END in node:
+                matches.append((end + 1, node[_PHRASE_END]))
+        return matches
+
+
+def _shared_tags(tags_by_key):
+    # Share one tuple per distinct tag combination (there are only a few dozen)
+    shared = {}
+    return {key: shared.setdefault(tuple(tags), tuple(tags)) for key, tags in tags_by_key.items()}
+
+
+def build_lexicon_index(lexicon):
+    """
+    Builds a hash index from lowercased surface form to its POS tags.
+    Multi-word entries are left out (see build_phrase_trie).
+
+    :param lexicon: Dictionary mapping non-terminals to lists of unquoted words
+        (see ``cfg.read_pos_words``).
+    :return: Dictionary mapping lowercased words to tuples of non-terminal names.
+    """
+    tags_by_word = {}
+    for non_terminal, words in lexicon.items():
+        for word in words:
+            if ' ' in word:
+                continue
+            tags = tags_by_word.setdefault(word.lower(), [])
+            if non_terminal not in tags:
+                tags.append(non_terminal)
+    return _shared_tags(tags_by_word)
+
+
+def build_phrase_trie(lexicon):
+    """
+    Builds a word-level trie of the multi-word entries.
+
+    :param lexicon: Dictionary mapping non-terminals to lists of unquoted words.
+    :return: Nested dictionaries keyed by lowercased word; a node holding the
+        ``_PHRASE_END`` key ends a phrase and stores its POS tags.
+    """
+    tags_by_phrase = {}
+    for non_terminal, words in lexicon.items():
+        for word in words:
+            phrase = tuple(word.lower().split())
+            if len(phrase) < 2:
+                continue
+            tags = tags_by_phrase.setdefault(phrase, [])
+            if non_terminal not in tags:
+                tags.append(non_terminal)
+
+    trie = {}
+    for phrase, tags in _shared_tags(tags_by_phrase).items():
+        node = trie
+        for word in phrase:
+            node = node.setdefault(word, {})
+        node[_PHRASE_END] = tags
+    return trie
+
+
+def read_lexicon(grammar_dir):
+    """
+    Reads the POS files and compiles them into a Lexicon.
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :return: A Lexicon.
+    """
+    lexicon = read_pos_words(grammar_dir)
+    return Lexicon(build_lexicon_index(lexicon), build_phrase_trie(lexicon))
+
+
+class LexiconCFG(CFG):
+    """
+    A CFG holding only the structural rules, with terminals looked up in a
+    lexicon index instead of being compiled into lexical productions.
+    """
+
+    def __init__(self, start, productions, lexicon):
+        CFG.__init__(self, start, productions)
+        self.lexicon = lexicon
+
+    def lexical_tags(self, token):
+        """
+        :return: The POS tags (non-terminal names) the token can take.
+        """
+        return self.lexicon.tags(token)
+
+    def phrases_at(self, tokens, start):
+        """
+        Finds the multi-word entries starting at a token.
+
+        :param tokens: The tokens of the sentence.
+        :param start: Index of the first token of the phrase.
+        :return: A list of (end, tags) tuples, one per matching phrase.
+        """
+        return self.lexicon.phrases_at(tokens, start)
+
+    def phrase_spans(self, tokens):
+        """
+        Finds every multi-word entry in a sentence (the lattice edges beyond
+        single tokens), in one pass over the tokens.
+
+        :param tokens: The tokens of the sentence.
+        :return: A list of (start, end, tags) tuples.
+        """
+        return [(start, end, tags)
+                for start in range(len(tokens))
+                for end, tags in self.phrases_at(tokens, start)]
+
+    def check_coverage(self, tokens):
+        covered = [bool(self.lexical_tags(tok)) for tok in tokens]
+        for start, end, _ in self.phrase_spans(tokens):
+            covered[start:end] = [True] * (end - start)
+        missing = [tok for tok, ok in zip(tokens, covered) if not ok]
+        if missing:
+            missing = ", ".join(f"{w!r}" for w in missing)
+            raise ValueError("Grammar does not cover some of the input words: %s." % missing)
+
+
+class LexiconPredictRule(AbstractChartRule):
+    """
+    Seeds the chart with a complete preterminal edge ``[NN -> 'cat' *]`` for
+    every POS tag the lexicon index gives each token, plus one spanning
+    several tokens (``[Aux -> 'ought' 'to' *]``) for every multi-word entry
+    starting there. The chart thus holds a word lattice rather than a
+    single token sequence.
+    """
+
+    NUM_EDGES = 1
+
+    def apply(self, chart, grammar, edge):
+        if not isinstance(edge, LeafEdge):
+            return
+        token = edge.lhs()
+        for tag in grammar.lexical_tags(token):
+            new_edge = TreeEdge(edge.span(), Nonterminal(tag), (token,), 1)
+            if chart.insert(new_edge, (edge,)):
+                yield new_edge
+
+        start = edge.start()
+        tokens = chart.leaves()
+        for end, tags in grammar.phrases_at(tokens, start):
+            words = tuple(tokens[start:end])
+            leaves = tuple(LeafEdge(word, index) for index, word in enumerate(words, start))
+            for tag in tags:
+                new_edge = TreeEdge((start, end), Nonterminal(tag), words, len(words))
+                if chart.insert(new_edge, leaves):
+                    yield new_edge
+
+
+class ParseCancelled(Exception):
+    """
+    Raised from inside the chart parser once its cancel event is set.
+    """
+
+
+class CancellationRule(AbstractChartRule):
+    """
+    Checks a cancel event (e.g. a ``threading.Event``) for every new edge,
+    so a long parse running on another thread can be stopped.
+    """
+
+    NUM_EDGES = 1
+
+    def __init__(self, cancel):
+        self._cancel = cancel
+
+    def apply(self, chart, grammar, edge):
+        if self._cancel.is_set():
+            raise ParseCancelled()
+        return ()
+
+
+class Deadline:
+    """
+    A cancel event for CancellationRule that sets itself at a point in time,
+    so a parse can be bounded without a timer thread.
+    """
+
+    def __init__(self, deadline):
+        """
+        :param deadline: A time.time() value.
+        """
+        self.deadline = deadline
+
+    def is_set(self):
+        return time.time() >= self.deadline
+
+
+LEXICON_STRATEGY = [
+    LeafInitRule(),
+    LexiconPredictRule(),
+    EmptyPredictRule(),
+    BottomUpPredictCombineRule(),
+    SingleEdgeFundamentalRule(),
+]
+
+
+def build_structural_grammar(lexicon):
+    """
+    Builds the grammar from the fixed rules in ``cfg.construct_grammar`` only.
+
+    :param lexicon: A Lexicon (see read_lexicon) or a lexicon_binary.BinaryLexicon.
+    :return: A LexiconCFG.
+    """
+    rules = CFG.fromstring(construct_grammar({}))
+    return LexiconCFG(rules.start(), rules.productions(), lexicon)
+
+
+class LexiconChart(Chart):
+    """
+    A Chart that can take over the edges of another chart in bulk.
+    """
+
+    def copy_edges(self, previous, end):
+        """
+        Copies every edge of another chart that ends at or before a position,
+        with its child pointer lists, without going through insert().
+
+        :param previous: A Chart over the same leading tokens.
+        :param end: Position up to which the tokens of both charts agree.
+        """
+        self._edges = [edge for edge in previous._edges if edge.end() <= end]
+        cpls = previous._edge_to_cpls
+        self._edge_to_cpls = {edge: OrderedDict(cpls[edge]) for edge in self._edges}
+
+        # Filter the select() indexes too rather than rebuilding them edge by edge
+        self._indexes = {}
+        for restr_keys, index in previous._indexes.items():
+            if 'end' in restr_keys:
+                # Every edge under a key shares its end position
+                position = restr_keys.index('end')
+                self._indexes[restr_keys] = {vals: list(edges) for vals, edges in index.items()
+                                             if vals[position] <= end}
+            else:
+                copied = self._indexes[restr_keys] = {}
+                for vals, edges in index.items():
+                    kept = [edge for edge in edges if edge.end() <= end]
+                    if kept:
+                        copied[vals] = kept
+
+
+class LexiconChartParser(ChartParser):
+    """
+    A ChartParser that can also re-parse an edited sentence starting from the
+    chart of its previous version.
+    """
+
+    def chart_parse_incremental(self, previous, tokens):
+        """
+        Same as chart_parse, but edges that lie entirely within the leading
+        tokens shared with an earlier chart are copied from it instead of being
+        derived again. Such edges only depend on those tokens, so the result
+        holds exactly the same edges as a full parse.
+
+        :param previous: A chart returned by an earlier parse with this grammar.
+        :param tokens: The tokens to parse.
+        :return: The new chart.
+        """
+        tokens = list(tokens)
+        prefix = 0
+        for old, new in zip(previous.leaves(), tokens):
+            if old != new:
+                break
+            prefix += 1
+        if not prefix or not self._use_agenda:
+            return self.chart_parse(tokens)
+
+        grammar = self._grammar
+        grammar.check_coverage(tokens)
+        chart = self._chart_class(tokens)
+        if isinstance(chart, LexiconChart):
+            chart.copy_edges(previous, prefix)
+        else:
+            for edge in previous.edges():
+                if edge.end() <= prefix:
+                    chart.insert(edge, *previous.child_pointer_lists(edge))
+
+        for axiom in self._axioms:
+            list(axiom.apply(chart, grammar))
+
+        # Copied edges have already met every partner inside the prefix. Only
+        # edges past it are new, plus the prefix leaves, whose multi-word
+        # entries may now reach into the new tokens.
+        agenda = [edge for edge in chart.edges()
+                  if edge.end() > prefix or isinstance(edge, LeafEdge)]
+        agenda.reverse()
+        inference_rules = self._inference_rules
+        while agenda:
+            edge = agenda.pop()
+            for rule in inference_rules:
+                agenda += list(rule.apply(chart, grammar, edge))
+        return chart
+
+
+def make_parser(grammar, cancel=None):
+    """
+    Creates a chart parser that takes its preterminals from the lexicon index.
+
+    :param grammar: A LexiconCFG.
+    :param cancel: Optional event; once set, parsing raises ParseCancelled.
+    :return: A LexiconChartParser.
+    """
+    strategy = LEXICON_STRATEGY if cancel is None else [CancellationRule(cancel)] + LEXICON_STRATEGY
+    return LexiconChartParser(grammar, strategy, chart_class=LexiconChart)
@@ -0,0 +1,237 @@
+# lexicon_binary.py
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+# File layout (all integers little-endian):
+#   header   magic, format version, tag count, entry count
+#   tags     one length-prefixed ASCII name per POS tag (bit i of a mask = tag i)
+#   offsets  entry count + 1 u32 offsets into the key blob
+#   masks    entry count u32 POS bitmasks
+#   keys     the lowercased entries, utf-8, sorted bytewise and concatenated
+# Multi-word entries are stored as their words joined by single spaces.
+MAGIC = b'BRLX'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHI')
+_U32 = struct.Struct('<I')
+
+
+def _entry_masks(lexicon_words):
+    # Same keys as lexicon.build_lexicon_index / build_phrase_trie
+    tags = list(lexicon_words)
+    if len(tags) > 32:
+        raise ValueError(f"At most 32 POS tags fit in a bitmask, got {len(tags)}")
+    masks = {}
+    for bit, non_terminal in enumerate(tags):
+        for word in lexicon_words[non_terminal]:
+            words = word.lower().split()
+            if ' ' not in word:
+                key = word.lower()
+            elif len(words) > 1:
+                key = ' '.join(words)
+            else:
+                continue
+            key = key.encode('utf-8')
+            masks[key] = masks.get(key, 0) | (1 << bit)
+    return tags, masks
+
+
+def write_binary_lexicon(lexicon_words, path):
+    """
+    Compiles the POS word lists into the binary lexicon format.
+
+    :param lexicon_words: Dictionary mapping non-terminals to lists of unquoted
+        words (see ``cfg.read_pos_words``).
+    :param path: Where to write the file.
+    :return: Number of entries written.
+    """
+    tags, masks = _entry_masks(lexicon_words)
+    keys = sorted(masks)
+
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(key))
+
+    # Write to a temp file first so a process mapping the file never sees half of it
+    # (mkstemp gives every writer, process or thread, a name of its own)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(tags), len(keys)))
+            for tag in tags:
+                name = tag.encode('ascii')
+                file.write(bytes((len(name),)) + name)
+            file.write(struct.pack(f'<{len(offsets)}I', *offsets))
+            file.write(struct.pack(f'<{len(keys)}I', *(masks[key] for key in keys)))
+            file.write(b''.join(keys))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(keys)
+
+
+def compile_binary_lexicon(grammar_dir, path):
+    """
+    Reads the POS files of a grammar directory and compiles them into a binary lexicon.
+
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    :param path: Where to write the file.
+    :return: Number of entries written.
+    """
+    from cfg import read_pos_words
+    return write_binary_lexicon(read_pos_words(grammar_dir), path)
+
+
+class BinaryLexicon:
+    """
+    Read-only view of a binary lexicon file. The file is memory-mapped and
+    searched in place, so opening it costs almost nothing and every process
+    mapping the same file shares one copy in the page cache. Offers the same
+    lookups as ``lexicon.Lexicon``.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path of a file written by write_binary_lexicon.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self._map.close()
+            raise
+        # Each distinct mask becomes one shared tuple of tag names
+        self._tags_by_mask = {}
+
+    def _read_header(self):
+        data = self._map
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{self.path} is too short to be a binary lexicon")
+        magic, version, tag_count, count = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} binary lexicon")
+
+        position = _HEADER.size
+        self.tag_names = []
+        for _ in range(tag_count):
+            length = data[position]
+            self.tag_names.append(data[position + 1:position + 1 + length].decode('ascii'))
+            position += 1 + length
+
+        self._count = count
+        self._offsets = position
+        self._masks = self._offsets + 4 * (count + 1)
+        self._keys = self._masks + 4 * count
+        if len(data) != self._keys + self._offset(count):
+            raise ValueError(f"{self.path} is truncated")
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, index):
+        return _U32.unpack_from(self._map, self._offsets + 4 * index)[0]
+
+    def _key(self, index):
+        return self._map[self._keys + self._offset(index):self._keys + self._offset(index + 1)]
+
+    def _lower_bound(self, key):
+        # Index of the first entry >= key
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _mask(self, key):
+        index = self._lower_bound(key)
+        if index < self._count and self._key(index) == key:
+            return _U32.unpack_from(self._map, self._masks + 4 * index)[0]
+        return 0
+
+    def _has_prefix(self, prefix):
+        index = self._lower_bound(prefix)
+        return index < self._count and self._key(index).startswith(prefix)
+
+    def _tags(self, mask):
+        tags = self._tags_by_mask.get(mask)
+        if tags is None:
+            tags = tuple(name for bit, name in enumerate(self.tag_names) if mask & (1 << bit))
+            self._tags_by_mask[mask] = tags
+        return tags
+
+    def tags(self, token):
+        """
+        :return: The POS tags (non-terminal names) the token can take.
+        """
+        if ' ' in token:
+            # Multi-word entries are only reachable through phrases_at
+            return ()
+        return self._tags(self._mask(token.lower().encode('utf-8')))
+
+    def phrases_at(self, tokens, start):
+        """
+        Finds the multi-word entries starting at a token.
+
+        :param tokens: The tokens of the sentence.
+        :param start: Index of the first token of the phrase.
+        :return: A list of (end, tags) tuples, one per matching phrase.
+        """
+        matches = []
+        key = tokens[start].lower().encode('utf-8')
+        for end in range(start + 1, len(tokens)):
+            key += b' '
+            # Stop as soon as no entry continues this far
+            if not self._has_prefix(key):
+                break
+            key += tokens[end].lower().encode('utf-8')
+            mask = self._mask(key)
+            if mask:
+                matches.append((end + 1, self._tags(mask)))
+        return matches
+
+    def close(self):
+        """
+        Unmaps the file (lookups fail afterwards).
+        """
+        self._map.close()
+
+    @property
+    def closed(self):
+        return self._map.closed
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description="Compile the POS files into a memory-mapped binary lexicon."
+    )
+    arg_parser.add_argument('--grammar-dir',
+                            default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grammar'),
+                            help="Directory containing the POS .txt files.")
+    arg_parser.add_argument('-o', '--output',
+                            help="Where to write the file (default: the grammar loader's cache).")
+    args = arg_parser.parse_args(argv)
+
+    path = args.output
+    if path is None:
+        from grammar_loader import grammar_digest, cache_path
+        path = cache_path(os.path.abspath(args.grammar_dir), grammar_digest(args.grammar_dir))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    count = compile_binary_lexicon(args.grammar_dir, path)
+    print(f"Wrote {count} entries to {path} ({os.path.getsize(path)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
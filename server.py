@@ -0,0 +1,470 @@
+# server.py
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from batch import TO_BRAILLE, FROM_BRAILLE, PARSE, DEFAULT_GRAMMAR_DIR, init_worker, process_chunk
+from cfg import preprocess_sentence, custom_tokenize
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Micro-batching: a batch is sent to a worker once it holds this many
+# requests, or once the first request has waited this long
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_DELAY_MS = 2
+
+# Requests waiting per endpoint before new ones are turned away with 503
+DEFAULT_MAX_QUEUE = 1024
+
+# Seconds before a request is answered with 504
+DEFAULT_TIMEOUT_SECONDS = 5.0
+
+# Largest accepted request body
+MAX_BODY_BYTES = 1024 * 1024
+
+# Most header lines per request (each line is capped by the StreamReader limit, 64 KiB)
+MAX_HEADERS = 100
+
+# Longest sentence (in tokens, each digit counting as one) /validate will parse
+MAX_VALIDATE_TOKENS = 64
+
+# Latencies kept per endpoint for the percentiles in /metrics
+LATENCY_SAMPLES = 10000
+
+# Endpoint -> batch mode
+ENDPOINTS = {
+    '/to_braille': TO_BRAILLE,
+    '/from_braille': FROM_BRAILLE,
+    '/validate': PARSE,
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class WorkerPool:
+    """
+    A worker pool that replaces its executor once it breaks. A worker process
+    that dies (crash, OOM kill) breaks a ProcessPoolExecutor for good, and every
+    later submission would fail with BrokenProcessPool.
+    """
+
+    def __init__(self, workers, mode, grammar_dir=DEFAULT_GRAMMAR_DIR):
+        """
+        :param workers: Number of worker processes (0 runs everything on one
+            thread inside the server process).
+        :param mode: The batch mode the workers are initialised for.
+        :param grammar_dir: Path to the directory containing POS .txt files.
+        """
+        self.workers = workers
+        self.mode = mode
+        self.grammar_dir = grammar_dir
+        self.executor = make_executor(workers, mode, grammar_dir)
+        self.restarts = 0
+
+    def _replace(self, broken):
+        # Several batches may notice the same breakage; only the first replaces it
+        if self.executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = make_executor(self.workers, self.mode, self.grammar_dir)
+            self.restarts += 1
+        return self.executor
+
+    async def run(self, function, *args):
+        """
+        Runs a function on the pool.
+
+        :raises BrokenExecutor: If the pool broke while running it (the pool is
+            replaced for the next call).
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            future = loop.run_in_executor(executor, function, *args)
+        except BrokenExecutor:
+            # Broken before this call, so nothing ran yet: use a fresh pool
+            executor = self._replace(executor)
+            future = loop.run_in_executor(executor, function, *args)
+        try:
+            return await future
+        except BrokenExecutor:
+            self._replace(executor)
+            raise
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for one mode into batches and runs each batch
+    on the worker pool. The queue is bounded and only a fixed number of batches
+    is in flight, so an overloaded server rejects requests instead of piling
+    them up.
+    """
+
+    def __init__(self, mode, pool, max_in_flight, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_delay=DEFAULT_MAX_DELAY_MS / 1000, max_queue=DEFAULT_MAX_QUEUE):
+        """
+        :param mode: TO_BRAILLE, FROM_BRAILLE or PARSE.
+        :param pool: The WorkerPool to run batches on.
+        :param max_in_flight: Number of batches handed to the pool at a time.
+        :param max_batch_size: Most requests per batch.
+        :param max_delay: Seconds a lone request waits for company.
+        :param max_queue: Most requests waiting for a batch.
+        """
+        self.mode = mode
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue(max_queue)
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.batches = 0
+        self.items = 0
+        self._tasks = set()
+
+    def submit(self, text, deadline):
+        """
+        Queues one text.
+
+        :param text: The text to process.
+        :param deadline: time.time() value after which its parse is stopped.
+        :return: A future resolving to its BatchResult.
+        :raises asyncio.QueueFull: If the queue is full.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, deadline, future))
+        return future
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch_size and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+                self._drain(batch)
+
+            # Requests that already timed out are not worth translating
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            await self.slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        # The worker gives up once the last request of the batch has timed out
+        deadline = max(deadline for _, deadline, _ in batch)
+        try:
+            results = await self.pool.run(
+                process_chunk, [text for text, _, _ in batch], self.mode, deadline
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.batches += 1
+            self.items += len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.slots.release()
+
+
+class Metrics:
+    """
+    Request counters and latency samples per endpoint.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters = {path: Counter() for path in ENDPOINTS}
+        self.latencies = {path: deque(maxlen=LATENCY_SAMPLES) for path in ENDPOINTS}
+
+    def record(self, path, outcome, seconds=None):
+        self.counters[path]['requests'] += 1
+        self.counters[path][outcome] += 1
+        if seconds is not None:
+            self.latencies[path].append(seconds)
+
+    def report(self, batchers):
+        endpoints = {}
+        pools = {}
+        for path, mode in ENDPOINTS.items():
+            samples = sorted(self.latencies[path])
+            batcher = batchers[mode]
+            endpoints[path] = {
+                'counters': dict(self.counters[path]),
+                'latency_ms': {
+                    name: samples[int(q * (len(samples) - 1))] * 1000 if samples else None
+                    for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))
+                },
+                'queue_depth': batcher.queue.qsize(),
+                'batches': batcher.batches,
+                'mean_batch_size': batcher.items / batcher.batches if batcher.batches else None,
+            }
+            pools[batcher.pool.mode] = {'workers': batcher.pool.workers, 'restarts': batcher.pool.restarts}
+        return {'uptime_s': time.monotonic() - self.started, 'endpoints': endpoints, 'pools': pools}
+
+
+class TranslationServer:
+    """
+    JSON-over-HTTP front end for the translators and the grammar check.
+
+    ``POST /to_braille``, ``/from_braille`` and ``/validate`` take
+    ``{"text": "..."}``; ``GET /metrics`` and ``GET /health`` report on the
+    server itself. Parses run on their own pool, so the cheap translations
+    never wait behind them.
+    """
+
+    def __init__(self, pool, max_in_flight, parse_pool, parse_in_flight,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_delay=DEFAULT_MAX_DELAY_MS / 1000,
+                 max_queue=DEFAULT_MAX_QUEUE, timeout=DEFAULT_TIMEOUT_SECONDS):
+        """
+        :param pool: WorkerPool for /to_braille and /from_braille.
+        :param max_in_flight: Translation batches handed to that pool at a time.
+        :param parse_pool: WorkerPool for /validate (workers initialised for PARSE).
+        :param parse_in_flight: Parse batches handed to that pool at a time.
+        """
+        self.timeout = timeout
+        self.metrics = Metrics()
+        self.batchers = {
+            mode: MicroBatcher(mode, pool, max_in_flight, max_batch_size, max_delay, max_queue)
+            for mode in (TO_BRAILLE, FROM_BRAILLE)
+        }
+        self.batchers[PARSE] = MicroBatcher(PARSE, parse_pool, parse_in_flight,
+                                            max_batch_size, max_delay, max_queue)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Starts the batchers and listens for connections.
+
+        :return: The asyncio Server.
+        """
+        self._runners = [asyncio.create_task(batcher.run()) for batcher in self.batchers.values()]
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, keep_alive, body = request
+                status, payload = await self.route(method, path, body)
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if path == '/metrics':
+            return HTTPStatus.OK, self.metrics.report(self.batchers)
+        if path not in ENDPOINTS:
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown endpoint: {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Use POST"}
+
+        try:
+            text = json.loads(body)['text']
+            if not isinstance(text, str):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return HTTPStatus.BAD_REQUEST, {'error': 'Expected a JSON object {"text": "..."}'}
+        if ENDPOINTS[path] == PARSE:
+            tokens = custom_tokenize(preprocess_sentence(text))
+            if len(tokens) > MAX_VALIDATE_TOKENS:
+                self.metrics.record(path, 'too_long')
+                return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {
+                    'error': f"Sentence has {len(tokens)} tokens, at most {MAX_VALIDATE_TOKENS} are parsed"
+                }
+        return await self.translate(path, text)
+
+    async def translate(self, path, text):
+        started = time.monotonic()
+        try:
+            future = self.batchers[ENDPOINTS[path]].submit(text, time.time() + self.timeout)
+        except asyncio.QueueFull:
+            self.metrics.record(path, 'rejected')
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': "Server is busy"}
+
+        try:
+            result = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics.record(path, 'timeouts', time.monotonic() - started)
+            return HTTPStatus.GATEWAY_TIMEOUT, {'error': f"Timed out after {self.timeout} seconds"}
+        except Exception as e:
+            self.metrics.record(path, 'errors', time.monotonic() - started)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"}
+
+        if result.error is not None:
+            self.metrics.record(path, 'invalid', time.monotonic() - started)
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {'error': result.error}
+        self.metrics.record(path, 'ok', time.monotonic() - started)
+        if ENDPOINTS[path] == PARSE:
+            return HTTPStatus.OK, {'grammatical': result.grammatical, 'tree_count': result.tree_count,
+                                   'braille': result.output}
+        return HTTPStatus.OK, {'result': result.output}
+
+
+async def read_request(reader):
+    """
+    Reads one HTTP/1.x request.
+
+    :return: (method, path, keep_alive, body), or None once the client hangs up.
+    :raises HTTPError: On a malformed or oversized request.
+    """
+    line = await _read_line(reader, HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+    if not line:
+        return None
+    try:
+        method, path, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await _read_line(reader, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header line too long")
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, f"More than {MAX_HEADERS} headers")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+    return method, path.split('?', 1)[0], keep_alive, body
+
+
+async def _read_line(reader, status, message):
+    try:
+        return await reader.readline()
+    except ValueError:
+        # The line outgrew the StreamReader limit (readline turns LimitOverrunError into this)
+        raise HTTPError(status, message)
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+    )
+
+
+def make_executor(workers, mode, grammar_dir=DEFAULT_GRAMMAR_DIR):
+    """
+    Creates a worker pool.
+
+    :param workers: Number of worker processes (0 runs everything on one
+        thread inside the server process).
+    :param mode: PARSE gives every worker its own warm parser.
+    :param grammar_dir: Path to the directory containing POS .txt files.
+    """
+    if workers == 0:
+        return ThreadPoolExecutor(1, initializer=init_worker, initargs=(grammar_dir, mode))
+    # Workers forked from the server itself would inherit its open client sockets
+    # (a pool replaced after a crash starts while connections are open)
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method),
+                               initializer=init_worker, initargs=(grammar_dir, mode))
+
+
+async def serve(host, port, workers, parse_workers, grammar_dir, **options):
+    pool = WorkerPool(workers, TO_BRAILLE, grammar_dir)
+    parse_pool = WorkerPool(parse_workers, PARSE, grammar_dir)
+    try:
+        # Start every worker (and load the grammar) before taking requests
+        await asyncio.gather(
+            *(pool.run(process_chunk, [], TO_BRAILLE) for _ in range(max(workers, 1))),
+            *(parse_pool.run(process_chunk, [], PARSE) for _ in range(max(parse_workers, 1))),
+        )
+
+        server = TranslationServer(pool, 2 * max(workers, 1),
+                                   parse_pool, max(parse_workers, 1), **options)
+        listener = await server.start(host, port)
+        print(f"Listening on http://{host}:{port} with {workers} translation and "
+              f"{parse_workers} parse worker(s)", file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        pool.shutdown()
+        parse_pool.shutdown()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description="Serve Braille translation and grammar validation as JSON over HTTP."
+    )
+    arg_parser.add_argument('--host', default=DEFAULT_HOST, help="Address to listen on.")
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Translation worker processes (0 = a single thread in the server process).")
+    arg_parser.add_argument('--parse-workers', type=int, default=1,
+                            help="Worker processes for /validate (0 = a single thread in the server process).")
+    arg_parser.add_argument('--grammar-dir', default=DEFAULT_GRAMMAR_DIR,
+                            help="Directory containing the POS .txt files.")
+    arg_parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                            help="Most requests handed to a worker at once.")
+    arg_parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY_MS,
+                            help="How long a request may wait for a batch to fill.")
+    arg_parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                            help="Waiting requests per endpoint before answering 503.")
+    arg_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT_SECONDS,
+                            help="Seconds before a request is answered with 504.")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.workers, args.parse_workers, args.grammar_dir,
+            max_batch_size=args.max_batch_size, max_delay=args.max_delay_ms / 1000,
+            max_queue=args.max_queue, timeout=args.timeout,
+        ))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# test_batch.py
+
+import os
+
+import pytest
+
+from batch import TO_BRAILLE, FROM_BRAILLE, PARSE, iter_batch, translate_batch, process_chunk, init_worker
+from braille_translator import translate_to_grade2_braille, translate_from_braille
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+
+def test_results_come_back_in_input_order():
+    sentences = [f"the cat sat {number}" for number in range(50)]
+    results = translate_batch(sentences, TO_BRAILLE, max_workers=2, chunk_size=3)
+    assert [result.input for result in results] == sentences
+    assert [result.output for result in results] == [translate_to_grade2_braille(s) for s in sentences]
+
+    braille = [result.output for result in results]
+    back = translate_batch(braille, FROM_BRAILLE, max_workers=2, chunk_size=7)
+    assert [result.output for result in back] == [translate_from_braille(b) for b in braille]
+
+
+def test_errors_stay_with_their_sentence():
+    results = translate_batch(["the cat", None, "a dog"], TO_BRAILLE, max_workers=1, chunk_size=2)
+    assert [result.error is None for result in results] == [True, False, True]
+    assert results[1].error.startswith("AttributeError")
+    assert results[2].output == translate_to_grade2_braille("a dog")
+
+
+@pytest.mark.parametrize('options', [
+    {'chunk_size': 0}, {'chunk_size': -1}, {'max_workers': 0}, {'max_workers': -2}, {'mode': 'sing'},
+])
+def test_bad_arguments_are_rejected_up_front(options):
+    with pytest.raises(ValueError):
+        iter_batch(["the cat"], **options)
+
+
+def test_parse_reports_unknown_words_as_ungrammatical():
+    init_worker(GRAMMAR_DIR, PARSE)
+    unknown, known = process_chunk(["zzyzx qwerty", "The cat sat"], PARSE)
+    assert (unknown.grammatical, unknown.tree_count, unknown.error) == (False, 0, None)
+    assert known.error is None
+    assert known.grammatical is True and known.tree_count > 0
+    assert known.output == translate_to_grade2_braille("The cat sat")
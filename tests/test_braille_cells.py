@@ -0,0 +1,54 @@
+# test_braille_cells.py
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import braille_cells
+from braille_translator import translate_to_grade2_braille, translate_from_braille
+
+TEXTS = [
+    "hello world",
+    "The Cat sat on 12 mats",
+    "cat\ndog",
+    "one\ttwo\r\nthree  four",
+    "Line 1\nLine 22\n",
+    "",
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_grade1_round_trip_keeps_words_apart(text):
+    cells = braille_cells.text_to_cells(text)
+    assert braille_cells.cells_to_text(cells).split() == text.split()
+
+
+def test_whitespace_becomes_blank_cells():
+    cells = braille_cells.text_to_cells("cat\ndog\tab")
+    assert list(cells == 0) == [False] * 3 + [True] + [False] * 3 + [True] + [False] * 2
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_grade2_round_trip_matches_translators(text):
+    cells = braille_cells.grade2_to_cells(text)
+    assert braille_cells.cells_to_unicode(cells, blank=' ') == translate_to_grade2_braille(text)
+    assert braille_cells.cells_to_grade2_text(cells) == translate_from_braille(translate_to_grade2_braille(text))
+
+
+def test_unicode_round_trip():
+    braille = '⠠⠮ ⠉⠁⠞\n⠼⠁⠃'
+    cells = braille_cells.unicode_to_cells(braille)
+    assert braille_cells.cells_to_unicode(cells, blank=' ') == braille.replace('\n', ' ')
+
+
+def test_unicode_rejects_other_characters():
+    with pytest.raises(ValueError, match="position 1"):
+        braille_cells.unicode_to_cells('⠁a')
+
+
+def test_dots_round_trip():
+    cells = braille_cells.text_to_cells("Braille 2025")
+    dots = braille_cells.cells_to_dots(cells)
+    assert dots.shape == (len(cells), 8)
+    assert (braille_cells.dots_to_cells(dots) == cells).all()
+    assert bytes(braille_cells.device_buffer(cells)) == cells.tobytes()
@@ -0,0 +1,94 @@
+# test_grammar_loader.py
+
+import gc
+import logging
+import os
+import shutil
+
+import pytest
+
+import grammar_loader
+from cfg import POS_FILES
+from grammar_loader import load_grammar, grammar_digest, cache_path, clear_grammar_cache, CACHE_DIRNAME
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+
+@pytest.fixture
+def grammar_dir(tmp_path):
+    directory = tmp_path / 'grammar'
+    directory.mkdir()
+    for filename in POS_FILES.values():
+        shutil.copy(os.path.join(GRAMMAR_DIR, filename), directory)
+    yield str(directory)
+    clear_grammar_cache(str(directory), remove_files=True)
+
+
+def add_noun(grammar_dir, word):
+    with open(os.path.join(grammar_dir, POS_FILES['NN']), 'a', encoding='utf-8') as file:
+        file.write(f"{word}\n")
+
+
+def cache_files(grammar_dir):
+    return sorted(name for name in os.listdir(os.path.join(grammar_dir, CACHE_DIRNAME))
+                  if name.endswith('.bin'))
+
+
+def test_grammar_is_loaded_once(grammar_dir):
+    grammar = load_grammar(grammar_dir)
+    assert load_grammar(grammar_dir) is grammar
+    assert cache_files(grammar_dir) == [os.path.basename(cache_path(grammar_dir, grammar_digest(grammar_dir)))]
+
+
+def test_touching_files_keeps_the_grammar(grammar_dir):
+    grammar = load_grammar(grammar_dir)
+    path = os.path.join(grammar_dir, POS_FILES['NN'])
+    os.utime(path, (1, 1))
+    assert load_grammar(grammar_dir) is grammar
+
+
+def test_editing_a_pos_file_rebuilds_the_grammar(grammar_dir):
+    grammar = load_grammar(grammar_dir)
+    with pytest.raises(ValueError):
+        grammar.check_coverage(['zzyzx'])
+    digest = grammar_digest(grammar_dir)
+
+    add_noun(grammar_dir, 'zzyzx')
+    assert grammar_digest(grammar_dir) != digest
+    edited = load_grammar(grammar_dir)
+    assert edited is not grammar
+    edited.check_coverage(['zzyzx'])
+    # The old grammar is still alive, so its file is kept
+    assert len(cache_files(grammar_dir)) == 2
+
+
+def test_superseded_caches_are_removed(grammar_dir):
+    load_grammar(grammar_dir)
+    add_noun(grammar_dir, 'zzyzx')
+    load_grammar(grammar_dir)
+    add_noun(grammar_dir, 'qwerty')
+    gc.collect()
+    load_grammar(grammar_dir)
+    assert cache_files(grammar_dir) == [os.path.basename(cache_path(grammar_dir, grammar_digest(grammar_dir)))]
+
+
+def test_corrupt_cache_is_rebuilt(grammar_dir, caplog):
+    load_grammar(grammar_dir)
+    path = cache_path(grammar_dir, grammar_digest(grammar_dir))
+    clear_grammar_cache(grammar_dir, remove_files=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(b'not a lexicon')
+
+    with caplog.at_level(logging.WARNING, logger=grammar_loader.__name__):
+        grammar = load_grammar(grammar_dir)
+    assert "Ignoring unreadable lexicon cache" in caplog.text
+    grammar.check_coverage(['the', 'cat'])
+
+
+def test_dictionary_lexicon_matches_binary_one(grammar_dir):
+    binary = load_grammar(grammar_dir)
+    clear_grammar_cache(grammar_dir)
+    in_memory = load_grammar(grammar_dir, use_disk_cache=False)
+    for token in ['the', 'cat', 'sat', 'ought', 'Will', '7', 'A-bomb']:
+        assert sorted(binary.lexicon.tags(token)) == sorted(in_memory.lexicon.tags(token))
@@ -0,0 +1,52 @@
+# test_incremental_parse.py
+
+import os
+
+import pytest
+
+from cfg import preprocess_sentence, custom_tokenize
+from forest import ParseForest
+from grammar_loader import get_parser
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+BASE = "The cat sat and the dog barked and the cat ate food on the table and the dog sat"
+
+# (earlier version, edited version) of a sentence, as typed in the GUI
+EDITS = [
+    (BASE + " and the cat", BASE + " and the cat sat"),
+    (BASE + " and the cat sat", BASE + " and the cat"),
+    (BASE, BASE + " and the cat"),
+    ("The cat ought", "The cat ought to eat food"),
+    ("1 2 3 4 5 6 7 8", "1 2 3 4 5 6 7 8 9"),
+    ("cat and dog and cat", "cat and dog and cat and dog"),
+    ("Will", "Will run"),
+    ("The cat", "The dog"),
+    ("The cat sat", "The cat sat"),
+]
+
+
+def tokens(sentence):
+    return custom_tokenize(preprocess_sentence(sentence))
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return get_parser(GRAMMAR_DIR)
+
+
+@pytest.mark.parametrize('before, after', EDITS)
+def test_incremental_chart_matches_full_chart(parser, before, after):
+    previous = parser.chart_parse(tokens(before))
+    full = parser.chart_parse(tokens(after))
+    incremental = parser.chart_parse_incremental(previous, tokens(after))
+    assert set(incremental.edges()) == set(full.edges())
+
+
+@pytest.mark.parametrize('before, after', EDITS)
+def test_incremental_forest_matches_full_forest(parser, before, after):
+    previous = ParseForest(parser, tokens(before))
+    full = ParseForest(parser, tokens(after))
+    incremental = ParseForest(parser, tokens(after), previous=previous)
+    assert incremental.count() == full.count()
+    assert [str(tree) for tree in incremental.trees(5)] == [str(tree) for tree in full.trees(5)]
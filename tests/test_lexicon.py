@@ -0,0 +1,20 @@
+# test_lexicon.py
+
+import os
+
+import pytest
+
+from grammar_loader import load_grammar
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+
+def test_coverage_error_lists_each_missing_word_once_quoted():
+    grammar = load_grammar(GRAMMAR_DIR)
+    with pytest.raises(ValueError) as error:
+        grammar.check_coverage(['the', 'zzyzx', 'cat', 'qwerty'])
+    assert str(error.value) == "Grammar does not cover some of the input words: 'zzyzx', 'qwerty'."
+
+
+def test_covered_tokens_pass():
+    load_grammar(GRAMMAR_DIR).check_coverage(['the', 'cat', 'sat'])
@@ -0,0 +1,91 @@
+# test_lexicon_binary.py
+
+import os
+
+import pytest
+
+from lexicon import read_lexicon
+from lexicon_binary import BinaryLexicon, write_binary_lexicon, compile_binary_lexicon, main
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+WORDS = {
+    'NN': ['cat', 'Dog', 'ice cream', 'ice', 'New York City'],
+    'Vt': ['eat', 'dog'],
+    'DT': ['the'],
+}
+
+
+@pytest.fixture
+def lexicon(tmp_path):
+    path = str(tmp_path / 'lexicon.bin')
+    assert write_binary_lexicon(WORDS, path) == 7
+    lexicon = BinaryLexicon(path)
+    yield lexicon
+    lexicon.close()
+
+
+def test_tags(lexicon):
+    assert lexicon.tags('cat') == ('NN',)
+    assert lexicon.tags('DOG') == ('NN', 'Vt')
+    assert lexicon.tags('the') == ('DT',)
+    assert lexicon.tags('cats') == ()
+    # Multi-word entries are only found through phrases_at
+    assert lexicon.tags('ice cream') == ()
+
+
+def test_phrases_at(lexicon):
+    tokens = ['the', 'new', 'york', 'city', 'ice', 'cream']
+    assert lexicon.phrases_at(tokens, 1) == [(4, ('NN',))]
+    assert lexicon.phrases_at(tokens, 4) == [(6, ('NN',))]
+    assert lexicon.phrases_at(tokens, 0) == []
+    assert lexicon.phrases_at(tokens, 5) == []
+
+
+def test_matches_dictionary_lexicon(tmp_path):
+    path = str(tmp_path / 'lexicon.bin')
+    compile_binary_lexicon(GRAMMAR_DIR, path)
+    binary = BinaryLexicon(path)
+    in_memory = read_lexicon(GRAMMAR_DIR)
+    try:
+        tokens = "the OK d cat would rather e er tween-decks run 7 zzyzx".split()
+        for start, token in enumerate(tokens):
+            assert sorted(binary.tags(token)) == sorted(in_memory.tags(token)), token
+            assert ([(end, sorted(tags)) for end, tags in binary.phrases_at(tokens, start)]
+                    == [(end, sorted(tags)) for end, tags in in_memory.phrases_at(tokens, start)]), token
+    finally:
+        binary.close()
+
+
+@pytest.mark.parametrize('corrupt, message', [
+    (lambda data: data[:5], "too short"),
+    (lambda data: b'XXXX' + data[4:], "not a version"),
+    (lambda data: data[:-1], "truncated"),
+    (lambda data: data + b'x', "truncated"),
+])
+def test_corrupt_files_are_rejected(tmp_path, corrupt, message):
+    path = str(tmp_path / 'lexicon.bin')
+    write_binary_lexicon(WORDS, path)
+    with open(path, 'rb') as file:
+        data = file.read()
+    with open(path, 'wb') as file:
+        file.write(corrupt(data))
+    with pytest.raises(ValueError, match=message):
+        BinaryLexicon(path)
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path):
+    too_many_tags = {f'T{number}': ['word'] for number in range(33)}
+    with pytest.raises(ValueError):
+        write_binary_lexicon(too_many_tags, str(tmp_path / 'lexicon.bin'))
+    with pytest.raises(UnicodeEncodeError):
+        # Fails half way through writing the temp file
+        write_binary_lexicon({'NN': ['cat'], 'Ω': ['dog']}, str(tmp_path / 'lexicon.bin'))
+    assert os.listdir(tmp_path) == []
+
+
+def test_main_writes_the_file(tmp_path, capsys):
+    path = str(tmp_path / 'out.bin')
+    assert main(['--grammar-dir', GRAMMAR_DIR, '-o', path]) == 0
+    assert f"to {path}" in capsys.readouterr().out
+    BinaryLexicon(path).close()
@@ -0,0 +1,107 @@
+# test_server.py
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from batch import TO_BRAILLE, PARSE
+from braille_translator import translate_to_grade2_braille
+from server import TranslationServer, WorkerPool, MAX_VALIDATE_TOKENS
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+
+async def send(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b'\r\n\r\n')
+    status = int(head.split()[1]) if head else None
+    return status, json.loads(body) if body else None
+
+
+def post(port, path, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+    return send(port, f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                      f"Connection: close\r\n\r\n".encode('latin-1') + body)
+
+
+def get(port, path):
+    return send(port, f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode('latin-1'))
+
+
+def with_server(test, workers=0, **options):
+    async def main():
+        pool = WorkerPool(workers, TO_BRAILLE, GRAMMAR_DIR)
+        parse_pool = WorkerPool(0, PARSE, GRAMMAR_DIR)
+        server = TranslationServer(pool, 2, parse_pool, 1, **options)
+        listener = await server.start('127.0.0.1', 0)
+        try:
+            return await test(listener.sockets[0].getsockname()[1], server)
+        finally:
+            listener.close()
+            for runner in server._runners:
+                runner.cancel()
+            pool.shutdown()
+            parse_pool.shutdown()
+    return asyncio.run(main())
+
+
+def test_translation_endpoints():
+    async def test(port, server):
+        assert await post(port, '/to_braille', {'text': "the cat"}) == (200, {'result': "⠮ ⠉⠁⠞"})
+        assert await post(port, '/from_braille', {'text': "⠮ ⠉⠁⠞"}) == (200, {'result': "the cat"})
+        assert (await get(port, '/health'))[0] == 200
+        metrics = (await get(port, '/metrics'))[1]
+        assert metrics['endpoints']['/to_braille']['counters']['ok'] == 1
+    with_server(test)
+
+
+@pytest.mark.parametrize('method, path, body, status', [
+    ('POST', '/nowhere', {'text': "x"}, 404),
+    ('GET', '/to_braille', None, 405),
+    ('POST', '/to_braille', b'not json', 400),
+    ('POST', '/to_braille', {'text': 3}, 400),
+    ('POST', '/validate', {'text': "1" * (MAX_VALIDATE_TOKENS + 1)}, 413),
+])
+def test_bad_requests(method, path, body, status):
+    async def test(port, server):
+        if method == 'GET':
+            return await get(port, path)
+        return await post(port, path, body)
+    assert with_server(test)[0] == status
+
+
+def test_validate():
+    async def test(port, server):
+        assert await post(port, '/validate', {'text': "The cat sat"}) == (200, {
+            'grammatical': True, 'tree_count': 1, 'braille': translate_to_grade2_braille("The cat sat"),
+        })
+        # Words outside the lexicon make a sentence ungrammatical, not an error
+        assert await post(port, '/validate', {'text': "zzyzx qwerty"}) == (200, {
+            'grammatical': False, 'tree_count': 0, 'braille': None,
+        })
+    with_server(test)
+
+
+def test_oversized_header_gets_an_answer():
+    async def test(port, server):
+        return await send(port, b"GET /health HTTP/1.1\r\nX-Big: " + b"a" * 100000 + b"\r\n\r\n")
+    assert with_server(test)[0] == 431
+
+
+def test_broken_pool_is_replaced():
+    async def test(port, server):
+        assert (await post(port, '/to_braille', {'text': "cat"}))[0] == 200
+        pool = server.batchers[TO_BRAILLE].pool
+        # Kill the worker process: the executor is broken from now on
+        with pytest.raises(Exception):
+            await asyncio.wrap_future(pool.executor.submit(os._exit, 1))
+        assert await post(port, '/to_braille', {'text': "dog"}) == (200, {'result': "⠙⠕⠛"})
+        assert pool.restarts == 1
+        assert (await get(port, '/metrics'))[1]['pools'][TO_BRAILLE]['restarts'] == 1
+    with_server(test, workers=1)
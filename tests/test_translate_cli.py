@@ -0,0 +1,67 @@
+# test_translate_cli.py
+
+import io
+import os
+
+import pytest
+
+import translate_cli
+from braille_translator import (encode_word, decode_word,
+                                translate_to_grade2_braille, translate_from_braille)
+from grammar_loader import get_parser
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+ENGLISH = "Hello ,  world\t12 cats , ; dog.\n\n  lead and trail  \nA , , b\r\nlast line"
+BRAILLE = "⠮ ⠉⠁⠞ ⠯ ⠼⠁⠃  ⠁ ⠠ ⠃   ⠼⠁⠃ \n ⠀⠁⠀ ⠁\n\n⠠"
+
+
+def translate(text, translate_word, separator, chunk_size, parser=None, errors=None):
+    out = io.StringIO()
+    invalid = translate_cli.translate_stream(io.StringIO(text), out, translate_word, separator,
+                                             chunk_size, parser, errors or io.StringIO())
+    return out.getvalue(), invalid
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return get_parser(GRAMMAR_DIR)
+
+
+@pytest.mark.parametrize('text, translate_word, separator, translate_line', [
+    (ENGLISH, encode_word, None, translate_to_grade2_braille),
+    (BRAILLE, decode_word, ' ', translate_from_braille),
+])
+def test_output_is_the_same_for_any_chunk_size(text, translate_word, separator, translate_line):
+    expected = '\n'.join(translate_line(line) for line in text.split('\n'))
+    for chunk_size in range(1, len(text) + 2):
+        assert translate(text, translate_word, separator, chunk_size)[0] == expected, chunk_size
+
+
+def test_validate_reports_sentences_without_parse(parser):
+    errors = io.StringIO()
+    _, invalid = translate("The cat sat.\nzzyzx qwerty!\n", encode_word, None, 5, parser, errors)
+    assert invalid == 1
+    assert errors.getvalue().startswith("Line 2: no parse for sentence: 'zzyzx qwerty!'")
+
+
+def test_validate_keeps_bounded_sentences(parser, monkeypatch):
+    seen = []
+    monkeypatch.setattr(translate_cli, 'is_valid_sentence', lambda parser, words: seen.append(len(words)))
+    translate("word " * 10000 + "end.", encode_word, None, 64, parser)
+    # Too long to parse: the words past the cap were never kept
+    assert seen == []
+    translate("word " * 10 + "end.", encode_word, None, 64, parser)
+    assert seen == [11]
+
+
+def test_main_translates_files(tmp_path):
+    source = tmp_path / 'in.txt'
+    source.write_text("the cat\n", encoding='utf-8')
+    braille = tmp_path / 'out.txt'
+    assert translate_cli.main([str(source), '-o', str(braille), '--chunk-size', '3']) == 0
+    assert braille.read_text(encoding='utf-8') == "⠮ ⠉⠁⠞\n"
+
+    english = tmp_path / 'back.txt'
+    assert translate_cli.main(['-b', str(braille), '-o', str(english)]) == 0
+    assert english.read_text(encoding='utf-8') == "the cat\n"
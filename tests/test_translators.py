@@ -0,0 +1,120 @@
+# test_translators.py
+
+import threading
+from collections import Counter
+
+import pytest
+
+import braille_translator
+import instrumentation
+from braille_translator import translate_to_grade2_braille, translate_from_braille
+from incremental import incremental_encoder, incremental_decoder
+
+# Outputs of the original (pre-optimisation) translators on a fixed corpus
+ENCODED = [
+    ('hello world', '⠓⠑⠇⠇⠕ ⠺⠕⠗⠇⠙'),
+    ('The cat sat on the mat.', '⠠⠮ ⠉⠁⠞ ⠎⠁⠞ ⠕⠝ ⠮ ⠍⠁⠞'),
+    ('Knowledge and understanding go together with the children', '⠠⠅⠝⠕⠺⠇⠑⠙⠛⠑ ⠯ ⠥⠝⠙⠑⠗⠎⠞⠁⠝⠙⠊⠝⠛ ⠛ ⠞⠕⠛⠑⠞⠓⠑⠗ ⠾ ⠮ ⠉⠓⠊⠇⠙⠗⠑⠝'),
+    ('I would rather be there than here', '⠠⠊ ⠺⠕⠥⠇⠙ ⠗⠁⠞⠓⠑⠗ ⠃⠑ ⠞⠓⠑⠗⠑ ⠞⠓⠁⠝ ⠓⠑⠗⠑'),
+    ('Ordinary people should always know about the ground', '⠠⠕⠗⠙⠊⠝⠁⠗⠽ ⠏⠑⠕⠏⠇⠑ ⠎⠓⠕⠥⠇⠙ ⠁⠇⠺⠁⠽⠎ ⠅⠝⠕⠺ ⠁⠃⠕⠥⠞ ⠮ ⠛⠗⠕⠥⠝⠙'),
+    ('Meet me at 10 or 2025 please!', '⠠⠍⠑⠑⠞ ⠍⠑ ⠁⠞ ⠼⠁⠚ ⠕⠗ ⠼⠃⠚⠃⠑ ⠏⠇⠑⠁⠎⠑'),
+    ('MIXED Case WORDS and numbers like 3rd and 42nd', '⠠⠍⠊⠭⠑⠙ ⠠⠉⠁⠎⠑ ⠠⠺⠕⠗⠙⠎ ⠯ ⠝⠥⠍⠃⠑⠗⠎ ⠇⠊⠅⠑ ⠗⠙ ⠯ ⠝⠙'),
+    ('Something ought to change for the better, however little.', '⠠⠎⠕⠍⠑⠞⠓⠊⠝⠛ ⠕⠥⠛⠓⠞ ⠞⠕ ⠉⠓⠁⠝⠛⠑ ⠿ ⠮ ⠃⠑⠞⠞⠑⠗ ⠓⠕⠺⠑⠧⠑⠗ ⠇⠊⠞⠞⠇⠑'),
+    ('friendship and fellowship in the afternoon', '⠋⠗⠊⠑⠝⠙⠎⠓⠊⠏ ⠯ ⠋⠑⠇⠇⠕⠺⠎⠓⠊⠏ ⠔ ⠮ ⠁⠋⠞⠑⠗⠝⠕⠕⠝'),
+    ('question: where were you yesterday? character counts', '⠟⠥⠑⠎⠞⠊⠕⠝ ⠺⠓⠑⠗⠑ ⠺⠑⠗⠑ ⠽ ⠽⠑⠎⠞⠑⠗⠙⠁⠽ ⠉⠓⠁⠗⠁⠉⠞⠑⠗ ⠉⠕⠥⠝⠞⠎'),
+    ('   leading and trailing spaces   ', '⠇⠑⠁⠙⠊⠝⠛ ⠯ ⠞⠗⠁⠊⠇⠊⠝⠛ ⠎⠏⠁⠉⠑⠎'),
+    ('', ''),
+    ('under the shade of the great oak tree', '⠥⠝⠙⠑⠗ ⠮ ⠎⠓⠁⠙⠑ ⠷ ⠮ ⠛⠗⠑⠁⠞ ⠕⠁⠅ ⠞⠗⠑⠑'),
+    ('ch sh th wh ed er ou ow st ing ar', '⠉⠓ ⠎⠓ ⠞⠓ ⠺⠓ ⠑⠙ ⠑⠗ ⠕⠥ ⠕⠺ ⠎⠞ ⠊⠝⠛ ⠁⠗'),
+]
+
+DECODED = [
+    ('⠼⠁⠃⠉ ⠼⠚', '123 0'),
+    ('⠠⠮ ⠠⠠⠉⠁⠞ ⠼⠁⠁⠃', 'The Cat 112'),
+    ('⠯ ⠿ ⠷ ⠾ ⠮ ⠔ ⠽ ⠞⠕ ⠛', 'and for of with the in you to go'),
+    ('⠼⠁⠃⠉⠙⠑ ⠁⠃⠉', '12345 abc'),
+    ('⠠⠁ ⠓⠑⠇⠇⠕  ⠺⠕⠗⠇⠙', 'A hello  world'),
+    ('⠿⠮ ⠯⠽ ⠼', 'y'),
+    ('⠓⠑⠇⠇⠕ ⠺⠕⠗⠇⠙', 'hello world'),
+    ('⠠⠮ ⠉⠁⠞ ⠎⠁⠞ ⠕⠝ ⠮ ⠍⠁⠞', 'The cat sat on the mat'),
+    ('⠠⠅⠝⠕⠺⠇⠑⠙⠛⠑ ⠯ ⠥⠝⠙⠑⠗⠎⠞⠁⠝⠙⠊⠝⠛ ⠛ ⠞⠕⠛⠑⠞⠓⠑⠗ ⠾ ⠮ ⠉⠓⠊⠇⠙⠗⠑⠝', 'Knowledge and understanding go together with the children'),
+    ('⠠⠊ ⠺⠕⠥⠇⠙ ⠗⠁⠞⠓⠑⠗ ⠃⠑ ⠞⠓⠑⠗⠑ ⠞⠓⠁⠝ ⠓⠑⠗⠑', 'I would rather be there than here'),
+    ('⠠⠕⠗⠙⠊⠝⠁⠗⠽ ⠏⠑⠕⠏⠇⠑ ⠎⠓⠕⠥⠇⠙ ⠁⠇⠺⠁⠽⠎ ⠅⠝⠕⠺ ⠁⠃⠕⠥⠞ ⠮ ⠛⠗⠕⠥⠝⠙', 'Ordinary people should always know about the ground'),
+    ('⠠⠍⠑⠑⠞ ⠍⠑ ⠁⠞ ⠼⠁⠚ ⠕⠗ ⠼⠃⠚⠃⠑ ⠏⠇⠑⠁⠎⠑', 'Meet me at 10 or 2025 please'),
+    ('⠠⠍⠊⠭⠑⠙ ⠠⠉⠁⠎⠑ ⠠⠺⠕⠗⠙⠎ ⠯ ⠝⠥⠍⠃⠑⠗⠎ ⠇⠊⠅⠑ ⠗⠙ ⠯ ⠝⠙', 'Mixed Canase Words and numbers like rd and nd'),
+    ('⠠⠎⠕⠍⠑⠞⠓⠊⠝⠛ ⠕⠥⠛⠓⠞ ⠞⠕ ⠉⠓⠁⠝⠛⠑ ⠿ ⠮ ⠃⠑⠞⠞⠑⠗ ⠓⠕⠺⠑⠧⠑⠗ ⠇⠊⠞⠞⠇⠑', 'Something ought to change for the better however little'),
+    ('⠋⠗⠊⠑⠝⠙⠎⠓⠊⠏ ⠯ ⠋⠑⠇⠇⠕⠺⠎⠓⠊⠏ ⠔ ⠮ ⠁⠋⠞⠑⠗⠝⠕⠕⠝', 'friendship and fellowship in the afternoon'),
+    ('⠟⠥⠑⠎⠞⠊⠕⠝ ⠺⠓⠑⠗⠑ ⠺⠑⠗⠑ ⠽ ⠽⠑⠎⠞⠑⠗⠙⠁⠽ ⠉⠓⠁⠗⠁⠉⠞⠑⠗ ⠉⠕⠥⠝⠞⠎', 'question where were you yesterday character counts'),
+    ('⠇⠑⠁⠙⠊⠝⠛ ⠯ ⠞⠗⠁⠊⠇⠊⠝⠛ ⠎⠏⠁⠉⠑⠎', 'leading and trailing spaces'),
+    ('⠥⠝⠙⠑⠗ ⠮ ⠎⠓⠁⠙⠑ ⠷ ⠮ ⠛⠗⠑⠁⠞ ⠕⠁⠅ ⠞⠗⠑⠑', 'under the shade of the great oak tree'),
+    ('⠉⠓ ⠎⠓ ⠞⠓ ⠺⠓ ⠑⠙ ⠑⠗ ⠕⠥ ⠕⠺ ⠎⠞ ⠊⠝⠛ ⠁⠗', 'ch sh th wh ed er ou ow st ing ar'),
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_word_caches():
+    braille_translator.clear_word_caches()
+    yield
+    instrumentation.disable()
+
+
+@pytest.mark.parametrize('text, braille', ENCODED)
+def test_encode_matches_baseline(text, braille):
+    assert translate_to_grade2_braille(text) == braille
+    # Second call is answered from the word cache
+    assert translate_to_grade2_braille(text) == braille
+
+
+@pytest.mark.parametrize('braille, text', DECODED)
+def test_decode_matches_baseline(braille, text):
+    assert translate_from_braille(braille) == text
+    assert translate_from_braille(braille) == text
+
+
+def test_instrumented_translation_matches_baseline():
+    instrumentation.enable()
+    for text, braille in ENCODED:
+        assert translate_to_grade2_braille(text) == braille
+    for braille, text in DECODED:
+        assert translate_from_braille(braille) == text
+
+
+def test_instrumentation_counts_word_cache_hits():
+    instrumentation.reset()
+    instrumentation.enable()
+    text = "the cat and the dog and the cat"
+    translate_to_grade2_braille(text)
+    counters = instrumentation.snapshot()['counters']
+    assert counters['encode.cache_hits'] == 4
+    assert counters['encode.cache_misses'] == 4
+
+    # The counters cover every word, cached or not
+    expected = Counter()
+    for word in text.split():
+        braille_translator._encode_word(word, None, expected)
+    for name, amount in expected.items():
+        assert counters[f'encode.{name}'] == amount
+
+
+def test_instrumentation_counts_hits_per_thread():
+    instrumentation.reset()
+    instrumentation.enable()
+    words = [f"word{number % 50}" for number in range(200)]
+    threads = [threading.Thread(target=translate_to_grade2_braille, args=(' '.join(words),))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counters = instrumentation.snapshot()['counters']
+    assert counters['encode.cache_hits'] + counters['encode.cache_misses'] == 8 * len(words)
+    assert counters['encode.cache_misses'] >= 50
+
+
+def test_incremental_translation_matches_baseline():
+    encoder = incremental_encoder()
+    for text, braille in ENCODED:
+        assert encoder.update(text) == braille
+    decoder = incremental_decoder()
+    for braille, text in DECODED:
+        assert decoder.update(braille) == text
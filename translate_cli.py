@@ -0,0 +1,228 @@
+# translate_cli.py
+
+import argparse
+import os
+import re
+import sys
+
+from braille_translator import encode_word, decode_word
+
+# Characters read from the input per chunk
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# A "word" longer than this is cut anyway, so memory stays bounded on input without whitespace
+MAX_WORD_LENGTH = 1024 * 1024
+
+# Sentences longer than this (in tokens, so a digit run counts once per digit) are not validated
+MAX_SENTENCE_TOKENS = 64
+
+# Words ending a sentence for --validate
+SENTENCE_END = re.compile(r'[.!?]+$')
+
+# Last whitespace in a partial line (everything after it may continue in the next chunk)
+LAST_WHITESPACE = re.compile(r'\s(?=\S*$)')
+
+
+def iter_chunks(stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Reads a text stream in fixed-size chunks.
+
+    :param stream: A text file object.
+    :param chunk_size: Number of characters per chunk.
+    :return: An iterator of strings.
+    """
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_segments(chunks, max_word_length=MAX_WORD_LENGTH, separator=None):
+    """
+    Re-cuts chunks on word separators so no word or number run is split
+    between two segments. Whatever follows the last separator of a chunk is
+    carried over to the next one, and the separator itself is dropped, so a
+    line is its segments joined by one separator.
+
+    :param chunks: An iterator of strings.
+    :param max_word_length: Force a cut if the carried-over text grows past this.
+    :param separator: What splits words (None = any whitespace).
+    :return: An iterator of (text, ends_line) tuples.
+    """
+    carry = ''
+    for chunk in chunks:
+        lines = (carry + chunk).split('\n')
+        for line in lines[:-1]:
+            yield line, True
+        partial = lines[-1]
+        if separator is None:
+            match = LAST_WHITESPACE.search(partial)
+            cut = match.start() if match else -1
+        else:
+            cut = partial.rfind(separator)
+        if cut >= 0:
+            yield partial[:cut], False
+            carry = partial[cut + 1:]
+        elif len(partial) > max_word_length:
+            yield partial, False
+            carry = ''
+        else:
+            carry = partial
+    if carry:
+        yield carry, False
+
+
+def is_valid_sentence(parser, words):
+    """
+    Checks a sentence against the grammar without enumerating its parse trees.
+
+    :param parser: An NLTK ChartParser.
+    :param words: The words of the sentence (trailing punctuation is ignored).
+    :return: True if the sentence has at least one parse (or is too long to
+        check, see MAX_SENTENCE_TOKENS).
+    """
+    from cfg import preprocess_sentence, custom_tokenize
+    from forest import cached_parse_forest
+
+    sentence = SENTENCE_END.sub('', ' '.join(words))
+    tokens = custom_tokenize(preprocess_sentence(sentence))
+    if not tokens or len(tokens) > MAX_SENTENCE_TOKENS:
+        return True
+    try:
+        return cached_parse_forest(parser, tokens).is_grammatical()
+    except ValueError:
+        # Some words are not in the lexicon
+        return False
+
+
+def translate_stream(in_stream, out_stream, translate_word, separator=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                     parser=None, errors=sys.stderr):
+    """
+    Translates a text stream chunk by chunk, keeping line breaks. Each line
+    comes out exactly as translating it whole would give (see
+    translate_to_grade2_braille / translate_from_braille), whatever the chunk size.
+
+    :param in_stream: A text file object to read from.
+    :param out_stream: A text file object to write to.
+    :param translate_word: Function translating one word (encode_word or decode_word).
+    :param separator: What splits the input into words (None = any whitespace
+        for English, ' ' for Braille).
+    :param chunk_size: Number of characters read at a time.
+    :param parser: If given, validate each sentence with this parser.
+    :param errors: Where to report sentences that fail validation.
+    :return: Number of sentences that failed validation.
+    """
+    line_number = 1
+    line_started = False     # A word of this line has been translated
+    line_has_output = False  # Part of its translation has been written
+    pending = ''             # Whitespace held back until more output follows on the line
+    sentence = []
+    sentence_words = 0  # Words of the sentence, including those past the ones kept
+    invalid = 0
+
+    def check_sentence():
+        nonlocal invalid, sentence_words
+        # Every word is at least one token (only a trailing "." can vanish), so
+        # a sentence this long is over MAX_SENTENCE_TOKENS and is not parsed
+        if sentence_words <= MAX_SENTENCE_TOKENS + 1 and not is_valid_sentence(parser, sentence):
+            invalid += 1
+            print(f"Line {line_number}: no parse for sentence: '{' '.join(sentence)}'", file=errors)
+        sentence.clear()
+        sentence_words = 0
+
+    for text, ends_line in iter_segments(iter_chunks(in_stream, chunk_size), separator=separator):
+        # Same as ' '.join(words).strip() over the whole line, written as it goes
+        for word in text.split(separator):
+            output = translate_word(word)
+            if line_started:
+                output = ' ' + output
+            line_started = True
+            output = pending + output
+            if not line_has_output:
+                output = output.lstrip()
+            written = output.rstrip()
+            if written:
+                out_stream.write(written)
+                line_has_output = True
+            pending = output[len(written):]
+
+        if parser is not None:
+            for word in text.split():
+                sentence_words += 1
+                if sentence_words <= MAX_SENTENCE_TOKENS + 1:
+                    sentence.append(word)
+                if SENTENCE_END.search(word):
+                    check_sentence()
+            if ends_line and sentence:
+                check_sentence()
+
+        if ends_line:
+            out_stream.write('\n')
+            line_number += 1
+            line_started = line_has_output = False
+            pending = ''
+
+    if parser is not None and sentence:
+        check_sentence()
+    return invalid
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description="Translate English text to Grade 2 Braille (or back) from files or stdin."
+    )
+    arg_parser.add_argument('files', nargs='*', default=['-'],
+                            help="Input files ('-' or nothing reads stdin).")
+    arg_parser.add_argument('-o', '--output', default='-',
+                            help="Output file ('-' writes stdout).")
+    arg_parser.add_argument('-b', '--from-braille', action='store_true',
+                            help="Translate Braille back to English.")
+    arg_parser.add_argument('--validate', action='store_true',
+                            help="Check each English sentence against the grammar (reported on stderr).")
+    arg_parser.add_argument('--grammar-dir',
+                            default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grammar'),
+                            help="Directory containing the POS .txt files.")
+    arg_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Characters read per chunk.")
+    args = arg_parser.parse_args(argv)
+
+    if args.from_braille:
+        translate_word, separator = decode_word, ' '
+    else:
+        translate_word, separator = encode_word, None
+
+    parser = None
+    if args.validate and not args.from_braille:
+        from grammar_loader import get_parser
+        parser = get_parser(args.grammar_dir)
+
+    if args.output == '-':
+        sys.stdout.reconfigure(encoding='utf-8')
+        out_stream = sys.stdout
+    else:
+        out_stream = open(args.output, 'w', encoding='utf-8')
+
+    invalid = 0
+    try:
+        for path in args.files:
+            if path == '-':
+                sys.stdin.reconfigure(encoding='utf-8')
+                invalid += translate_stream(sys.stdin, out_stream, translate_word, separator,
+                                            args.chunk_size, parser)
+            else:
+                with open(path, 'r', encoding='utf-8') as in_stream:
+                    invalid += translate_stream(in_stream, out_stream, translate_word, separator,
+                                                args.chunk_size, parser)
+    finally:
+        if out_stream is not sys.stdout:
+            out_stream.close()
+
+    if invalid:
+        print(f"{invalid} sentence(s) failed grammar validation.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())